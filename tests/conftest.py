@@ -0,0 +1,67 @@
+import asyncio
+import json
+import os
+import shutil
+
+import pytest
+
+import tool.__main__ as tool_main
+from tool.sources import LocalSource
+from tool.utils import DATA_DIRECTORY_PATH
+
+INDEX_HEADER = 'ProviderNamespace,ResourceType,ModuleDisplayName,ModuleName,ModuleStatus,RepoURL,PublicRegistryReference,TelemetryIdPrefix,PrimaryModuleOwnerGHHandle'
+
+class LocalMirror:
+    """A module index and a directory of checked-out modules for `LocalSource`, written by the test."""
+    def __init__(self, directory: str):
+        self.index_path = os.path.join(directory, 'index.csv')
+        self.mirror_directory = os.path.join(directory, 'modules')
+        os.makedirs(self.mirror_directory, exist_ok=True)
+
+    def write_module(self, module_name: str, variables: str, outputs: list[str], example: str):
+        """Write a module with `variables` as its variables.tf, the named outputs and one example."""
+        module_directory = os.path.join(self.mirror_directory, module_name)
+        shutil.rmtree(module_directory, ignore_errors=True)
+        os.makedirs(os.path.join(module_directory, 'examples', 'default'))
+        with open(os.path.join(module_directory, 'variables.tf'), 'w', encoding='utf-8') as f:
+            f.write(variables)
+        with open(os.path.join(module_directory, 'outputs.tf'), 'w', encoding='utf-8') as f:
+            f.write(''.join(f'output "{output}" {{\n  value = "x"\n}}\n\n' for output in outputs))
+        with open(os.path.join(module_directory, 'examples', 'default', 'main.tf'), 'w', encoding='utf-8') as f:
+            f.write(example)
+
+    def remove_module(self, module_name: str):
+        shutil.rmtree(os.path.join(self.mirror_directory, module_name))
+
+    def source(self) -> LocalSource:
+        """A source over the modules currently in the mirror."""
+        rows = [INDEX_HEADER]
+        for module_name in sorted(os.listdir(self.mirror_directory)):
+            repo_url = f'https://github.com/Azure/terraform-azurerm-{module_name}'
+            rows.append(f'x,y,{module_name},{module_name},Available,{repo_url},,,')
+        with open(self.index_path, 'w', encoding='utf-8') as f:
+            f.write('\n'.join(rows) + '\n')
+        return LocalSource(self.index_path, self.mirror_directory)
+
+@pytest.fixture
+def local_mirror(tmp_path) -> LocalMirror:
+    yield LocalMirror(str(tmp_path / 'mirror'))
+    shutil.rmtree(DATA_DIRECTORY_PATH, ignore_errors=True)
+
+@pytest.fixture
+def run_tool(tmp_path, monkeypatch):
+    """Run `python -m tool` over a source with its output in a temporary directory, return the data it wrote."""
+    output_directory = tmp_path / 'data'
+    output_directory.mkdir()
+    monkeypatch.setattr(tool_main, 'ORIGIN_DATA_FILE_PATH', str(output_directory / 'avm_data.json'))
+    monkeypatch.setattr(tool_main, 'MANIFEST_FILE_PATH', str(output_directory / 'avm_manifest.json'))
+    for name in ('TYPE_TABLE_FILE_PATH', 'TEXT_TABLE_FILE_PATH', 'MODULES_FILE_PATH', 'MODULE_INDEX_FILE_PATH'):
+        monkeypatch.setattr(tool_main, name, str(output_directory / name.lower()))
+
+    def run(source: LocalSource, incremental: bool = False) -> dict[str, dict]:
+        asyncio.run(tool_main.main(incremental, source))
+        with open(tool_main.ORIGIN_DATA_FILE_PATH, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    yield run
+    shutil.rmtree(DATA_DIRECTORY_PATH, ignore_errors=True)
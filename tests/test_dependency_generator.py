@@ -0,0 +1,76 @@
+import asyncio
+import copy
+import random
+
+import pytest
+
+from tool.dependency_generator import DependencyGenerator
+from .test_dependency_graph import random_dependencies
+
+def module_data(module_dependencies: list[str]) -> dict:
+    """A module with one required variable whose schema refers to the outputs of `module_dependencies`."""
+    references = ' '.join(f"module.{dependency.replace('-', '_')}.resource_id" for dependency in module_dependencies)
+    return {'variables': {'id': {'required': True, 'schema': f'id = [{references}]\n'}}}
+
+def generate(data: dict[str, dict], module_names=None, previous_data: dict[str, dict] = None):
+    asyncio.run(DependencyGenerator(data).generate(module_names, previous_data))
+
+def full_run(data: dict[str, dict]) -> dict[str, dict]:
+    data = copy.deepcopy(data)
+    generate(data)
+    return data
+
+def test_removed_module_moves_its_dependents_up():
+    data = {
+        'avm-res-a': module_data([]),
+        'avm-res-b': module_data(['avm-res-a']),
+        'avm-res-c': module_data(['avm-res-a', 'avm-res-b']),
+    }
+    generate(data)
+    assert data['avm-res-c']['layer'] == 2
+
+    # c is not refreshed, it keeps the schemas that still refer to b
+    previous_data = copy.deepcopy(data)
+    del data['avm-res-b']
+    generate(data, set(), previous_data)
+    assert data['avm-res-c']['layer'] == 1
+    assert data['avm-res-c']['layer'] == full_run(data)['avm-res-c']['layer']
+
+@pytest.mark.parametrize('seed', range(20))
+def test_partial_refresh_matches_full_recomputation(seed):
+    rng = random.Random(seed)
+    module_names = [f'avm-res-{index:03}' for index in range(rng.randint(1, 60))]
+    rng.shuffle(module_names)
+    data = {k: module_data(v) for k, v in random_dependencies(rng, module_names).items()}
+    generate(data)
+
+    for refresh_round in range(10):
+        previous_data = copy.deepcopy(data)
+        # a random topological order, dependencies only ever point backwards in it
+        order = sorted(data, key=lambda module_name: data[module_name]['priority'])
+        removed = set(rng.sample(order, rng.randint(0, min(3, len(order)))))
+        order = [module_name for module_name in order if module_name not in removed]
+        for index in range(rng.randint(0, 3)):
+            order.insert(rng.randint(0, len(order)), f'avm-res-new{refresh_round}x{index}')
+
+        # changed and new modules are parsed again, the others keep their previous schemas and dependencies
+        data = {}
+        changed = set()
+        for index, module_name in enumerate(order):
+            if module_name not in previous_data or rng.random() < 0.15:
+                data[module_name] = module_data(rng.sample(order[:index], rng.randint(0, min(index, 4))))
+                changed.add(module_name)
+            else:
+                data[module_name] = copy.deepcopy({k: previous_data[module_name][k] for k in ('variables', 'denpends_on')})
+        generate(data, changed, previous_data)
+
+        full = full_run(data)
+        for module_name, module in data.items():
+            assert module['layer'] == full[module_name]['layer']
+            # closures are listed in priority order, which a partial refresh only keeps relative
+            for key in ('required', 'optional'):
+                assert sorted(module['closure'][key]) == sorted(full[module_name]['closure'][key])
+            for dependency in module['denpends_on']['avm_depends_on']:
+                if dependency in data:
+                    assert data[dependency]['priority'] < module['priority']
+        assert len({module['priority'] for module in data.values()}) == len(data)
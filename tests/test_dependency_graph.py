@@ -0,0 +1,85 @@
+import random
+
+import pytest
+
+from tool.dependency_graph import DependencyGraph
+
+def random_dependencies(rng: random.Random, module_names: list[str]) -> dict[str, list[str]]:
+    """A random DAG: every module depends only on modules before it in `module_names`."""
+    dependencies = {}
+    for index, module_name in enumerate(module_names):
+        count = rng.randint(0, min(index, 4))
+        dependencies[module_name] = rng.sample(module_names[:index], count)
+    return dependencies
+
+def full_order(graph: DependencyGraph) -> tuple[dict[str, int], dict[str, int]]:
+    """Priorities and layers as a full run of the dependency generator assigns them."""
+    priorities = {}
+    layers = {}
+    for layer, layer_modules in enumerate(graph.layers()):
+        for module_name in layer_modules:
+            priorities[module_name] = len(priorities)
+            layers[module_name] = layer
+    return priorities, layers
+
+def refresh(rng: random.Random, dependencies: dict[str, list[str]], next_id: int) -> tuple[dict[str, list[str]], set[str]]:
+    """Change, add and remove random modules, return the new dependencies and the modules whose dependencies changed."""
+    # a random topological order, dependencies only ever point backwards in it
+    order = [module_name for layer in DependencyGraph(dependencies).layers() for module_name in layer]
+
+    removed = set(rng.sample(order, rng.randint(0, min(3, len(order)))))
+    order = [module_name for module_name in order if module_name not in removed]
+    for _ in range(rng.randint(0, 3)):
+        order.insert(rng.randint(0, len(order)), f'new-{next_id}')
+        next_id += 1
+
+    result = {}
+    changed = set()
+    for index, module_name in enumerate(order):
+        if module_name.startswith('new-') or rng.random() < 0.15:
+            count = rng.randint(0, min(index, 4))
+            result[module_name] = rng.sample(order[:index], count)
+        else:
+            result[module_name] = [dependency for dependency in dependencies[module_name] if dependency not in removed]
+        if sorted(set(result[module_name])) != sorted(set(dependencies.get(module_name, []))):
+            changed.add(module_name)
+    return result, changed
+
+@pytest.mark.parametrize('seed', range(20))
+def test_update_order_matches_full_recomputation(seed):
+    rng = random.Random(seed)
+    module_names = [f'avm-res-{index:03}' for index in range(rng.randint(1, 80))]
+    rng.shuffle(module_names)
+    dependencies = random_dependencies(rng, module_names)
+    priorities, layers = full_order(DependencyGraph(dependencies))
+
+    for refresh_round in range(10):
+        dependencies, changed = refresh(rng, dependencies, refresh_round * 10)
+        graph = DependencyGraph(dependencies)
+        updated_priorities, updated_layers = graph.update_order(priorities, layers, changed)
+
+        assert updated_layers == full_order(graph)[1]
+        assert sorted(updated_priorities) == sorted(dependencies)
+        assert len(set(updated_priorities.values())) == len(updated_priorities)
+        for module_name, module_dependencies in dependencies.items():
+            for dependency in module_dependencies:
+                assert updated_priorities[dependency] < updated_priorities[module_name]
+
+        # modules that neither changed nor depend on a changed module keep their priority
+        affected = set(changed) | {k for k in dependencies if k not in priorities}
+        stack = list(affected)
+        while stack:
+            for dependent in graph.dependents[stack.pop()]:
+                if dependent not in affected:
+                    affected.add(dependent)
+                    stack.append(dependent)
+        for module_name in dependencies:
+            if module_name not in affected:
+                assert updated_priorities[module_name] == priorities[module_name]
+
+        priorities, layers = updated_priorities, updated_layers
+
+def test_update_order_reports_a_cycle():
+    graph = DependencyGraph({'a': [], 'b': ['c'], 'c': ['d'], 'd': ['b']})
+    with pytest.raises(Exception, match='b -> c -> d -> b'):
+        graph.update_order({'a': 0, 'b': 1, 'c': 2, 'd': 3}, {'a': 0, 'b': 0, 'c': 0, 'd': 0}, {'d'})
@@ -0,0 +1,160 @@
+import asyncio
+import contextlib
+import random
+import time
+
+import pytest
+from aiohttp import web
+
+from tool.github_client import GitHubClient
+from tool.http_client import HttpClient, HttpError
+from tool.utils import TaskRunner
+
+@contextlib.asynccontextmanager
+async def mock_github(handler):
+    """
+    Serve `handler(request, attempt)` on a free local port for every path, `attempt` counting from 0.
+    Yields the base URL and the list of (arrival time, request headers, response status) of every request.
+    """
+    requests = []
+
+    async def record(request: web.Request) -> web.Response:
+        arrived_at = time.time()
+        response = await handler(request, len(requests))
+        requests.append((arrived_at, dict(request.headers), response.status))
+        return response
+
+    app = web.Application()
+    app.router.add_route('*', '/{path:.*}', record)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, '127.0.0.1', 0)
+    await site.start()
+    try:
+        yield f'http://127.0.0.1:{runner.addresses[0][1]}', requests
+    finally:
+        await runner.cleanup()
+
+def run_client(handler, test, **kwargs):
+    async def run():
+        async with mock_github(handler) as (base_url, requests):
+            async with HttpClient() as http_client:
+                kwargs.setdefault('cache_path', None)
+                await test(lambda: GitHubClient(http_client, {}, **kwargs), base_url, requests)
+    asyncio.run(run())
+
+def test_not_modified_replays_the_cached_body(tmp_path):
+    async def handler(request, attempt):
+        if request.headers.get('If-None-Match') == '"v1"':
+            return web.Response(status=304, headers={'ETag': '"v1"'})
+        return web.json_response({'tag_name': 'v1.0.0'}, headers={'ETag': '"v1"'})
+
+    async def test(create_client, base_url, requests):
+        url = f'{base_url}/repos/Azure/terraform-azurerm-avm-res-keyvault-vault/releases/latest'
+        client = create_client()
+        assert await client.get_json(url) == {'tag_name': 'v1.0.0'}
+        client.save()
+
+        # a later run revalidates with the ETag stored by the previous one
+        assert await create_client().get_json(url) == {'tag_name': 'v1.0.0'}
+        assert [status for _, _, status in requests] == [200, 304]
+        assert 'If-None-Match' not in requests[0][1]
+        assert requests[1][1]['If-None-Match'] == '"v1"'
+
+    run_client(handler, test, cache_path=str(tmp_path / 'github_etags.json'))
+
+def test_retry_after_pauses_requests():
+    async def handler(request, attempt):
+        if attempt == 0:
+            return web.Response(status=429, headers={'Retry-After': '1'})
+        return web.json_response({})
+
+    async def test(create_client, base_url, requests):
+        assert await create_client().get_json(f'{base_url}/rate_limited') == {}
+        assert [status for _, _, status in requests] == [429, 200]
+        assert requests[1][0] - requests[0][0] >= 1
+
+    run_client(handler, test, backoff_base=0)
+
+def test_exhausted_rate_limit_waits_for_the_reset():
+    reset_at = int(time.time()) + 2
+
+    async def handler(request, attempt):
+        if attempt == 0:
+            return web.Response(status=403, headers={'X-RateLimit-Remaining': '0', 'X-RateLimit-Reset': str(reset_at)})
+        return web.json_response({}, headers={'X-RateLimit-Remaining': '4999'})
+
+    async def test(create_client, base_url, requests):
+        assert await create_client().get_json(f'{base_url}/exhausted') == {}
+        assert [status for _, _, status in requests] == [403, 200]
+        assert requests[1][0] >= reset_at
+
+    run_client(handler, test, backoff_base=0)
+
+def test_rate_limit_wait_does_not_count_against_the_task_timeout():
+    reset_at = int(time.time()) + 2
+
+    async def handler(request, attempt):
+        if attempt == 0:
+            return web.Response(status=403, headers={'X-RateLimit-Remaining': '0', 'X-RateLimit-Reset': str(reset_at)})
+        await asyncio.sleep(0.3)
+        return web.json_response({}, headers={'X-RateLimit-Remaining': '4999'})
+
+    async def test(create_client, base_url, requests):
+        client = create_client()
+        outcome = await TaskRunner(timeout=1).call(client.get_json(f'{base_url}/exhausted'))
+        assert outcome.error is None and outcome.result == {}
+        assert [status for _, _, status in requests] == [403, 200]
+
+        # time outside of the wait still counts
+        outcome = await TaskRunner(timeout=0.1).call(client.get_json(f'{base_url}/slow'))
+        assert isinstance(outcome.error, TimeoutError)
+
+    run_client(handler, test, backoff_base=0)
+
+def test_remaining_budget_limits_requests_in_flight():
+    remaining = iter(['120', '4999'])
+
+    async def handler(request, attempt):
+        return web.json_response({}, headers={'X-RateLimit-Remaining': next(remaining)})
+
+    async def test(create_client, base_url, requests):
+        client = create_client()
+        await client.get_json(f'{base_url}/low')
+        assert client.concurrency == 2
+        await client.get_json(f'{base_url}/high')
+        assert client.concurrency == 10
+
+    run_client(handler, test, max_concurrency=10)
+
+def test_server_errors_are_retried_with_jittered_backoff(monkeypatch):
+    bounds = []
+
+    def uniform(low, high):
+        bounds.append((low, high))
+        return 0
+
+    async def handler(request, attempt):
+        if attempt < 2:
+            return web.Response(status=503)
+        return web.json_response({})
+
+    async def test(create_client, base_url, requests):
+        monkeypatch.setattr(random, 'uniform', uniform)
+        assert await create_client().get_json(f'{base_url}/unavailable') == {}
+        assert [status for _, _, status in requests] == [503, 503, 200]
+        # full jitter over an exponentially growing window
+        assert bounds == [(0, 0.5), (0, 1.0)]
+
+    run_client(handler, test, backoff_base=0.5)
+
+def test_gives_up_after_max_retries():
+    async def handler(request, attempt):
+        return web.Response(status=500)
+
+    async def test(create_client, base_url, requests):
+        with pytest.raises(HttpError):
+            await create_client().get_json(f'{base_url}/broken')
+        assert len(requests) == 3
+
+    run_client(handler, test, max_retries=2, backoff_base=0)
@@ -0,0 +1,140 @@
+import json
+
+from tool import manifest, rule_generator
+from tool.data_parser import variable_parser
+from tool.utils import AZURERM_TO_AVM_FILE_PATH
+
+RESOURCE_GROUP_VARIABLES = '''
+variable "name" {
+  type        = string
+  description = "The name of the resource group."
+}
+variable "location" {
+  type        = string
+  description = "Location."
+}
+'''
+
+RESOURCE_GROUP_EXAMPLE = '''
+module "test" {
+  source   = "../../"
+  location = "eastus"
+  name     = "rg-test"
+}
+'''
+
+KEY_VAULT_VARIABLES = '''
+variable "name" {
+  type        = string
+  description = "The name."
+}
+variable "resource_group_name" {
+  type        = string
+  description = "RG name."
+}
+'''
+
+KEY_VAULT_EXAMPLE = '''
+resource "azurerm_resource_group" "this" {
+  location = "eastus"
+  name     = "rg"
+}
+module "kv" {
+  source              = "../../"
+  name                = "kv1"
+  resource_group_name = azurerm_resource_group.this.name
+}
+'''
+
+STORAGE_VARIABLES = '''
+variable "name" {
+  type        = string
+  description = "The name."
+}
+variable "key_vault_uri" {
+  type        = string
+  description = "The key vault holding the customer managed key."
+}
+'''
+
+STORAGE_EXAMPLE = '''
+resource "azurerm_key_vault" "this" {
+  name = "kv"
+}
+module "sa" {
+  source        = "../../"
+  name          = "sa1"
+  key_vault_uri = azurerm_key_vault.this.vault_uri
+}
+'''
+
+def without_priorities(data: dict[str, dict]) -> dict[str, dict]:
+    return {k: {key: value for key, value in v.items() if key != 'priority'} for k, v in data.items()}
+
+def assert_same_as_full_run(incremental: dict[str, dict], full: dict[str, dict]):
+    # a partial refresh keeps the priorities of modules it does not move, only their order has to hold
+    for module in incremental.values():
+        for dependency in module['denpends_on']['avm_depends_on']:
+            assert incremental[dependency]['priority'] < module['priority']
+    assert without_priorities(incremental) == without_priorities(full)
+
+def write_modules(local_mirror, key_vault_outputs: list[str]):
+    local_mirror.write_module('avm-res-resources-resourcegroup', RESOURCE_GROUP_VARIABLES, ['name', 'resource_id'], RESOURCE_GROUP_EXAMPLE)
+    local_mirror.write_module('avm-res-keyvault-vault', KEY_VAULT_VARIABLES, key_vault_outputs, KEY_VAULT_EXAMPLE)
+    local_mirror.write_module('avm-res-storage-storageaccount', STORAGE_VARIABLES, ['name', 'resource_id'], STORAGE_EXAMPLE)
+
+def test_new_output_refreshes_the_modules_whose_examples_refer_to_it(local_mirror, run_tool):
+    write_modules(local_mirror, ['name', 'resource_id'])
+    before = run_tool(local_mirror.source())
+    storage = before['avm-res-storage-storageaccount']
+    assert 'avm-res-keyvault-vault' not in storage['denpends_on']['avm_depends_on']
+
+    # a new key vault release adds the output the storage example refers to
+    write_modules(local_mirror, ['name', 'resource_id', 'vault_uri'])
+    incremental = run_tool(local_mirror.source(), incremental=True)
+    storage = incremental['avm-res-storage-storageaccount']
+    assert 'module.avm_res_keyvault_vault.vault_uri' in storage['variables']['key_vault_uri']['schema']
+    assert storage['denpends_on']['avm_depends_on'] == ['avm-res-keyvault-vault']
+
+    assert_same_as_full_run(incremental, run_tool(local_mirror.source()))
+
+def test_removed_module_refreshes_the_modules_whose_examples_refer_to_it(local_mirror, run_tool):
+    write_modules(local_mirror, ['name', 'resource_id', 'vault_uri'])
+    run_tool(local_mirror.source())
+
+    local_mirror.remove_module('avm-res-keyvault-vault')
+    incremental = run_tool(local_mirror.source(), incremental=True)
+    assert incremental['avm-res-storage-storageaccount']['denpends_on']['avm_depends_on'] == []
+
+    assert_same_as_full_run(incremental, run_tool(local_mirror.source()))
+
+def test_removed_rule_is_removed_from_unchanged_modules(local_mirror, run_tool, tmp_path, monkeypatch):
+    write_modules(local_mirror, ['name', 'resource_id', 'vault_uri'])
+    rules_file_path = tmp_path / 'rules.json'
+    rules_file_path.write_text(json.dumps({'avm-res-keyvault-vault': {'variables': {'name': 'Must be globally unique.'}}}))
+    monkeypatch.setattr(rule_generator, 'RULES_FILE_PATH', str(rules_file_path))
+    assert run_tool(local_mirror.source())['avm-res-keyvault-vault']['variables']['name']['rules'] == 'Must be globally unique.'
+
+    rules_file_path.write_text(json.dumps({}))
+    incremental = run_tool(local_mirror.source(), incremental=True)
+    assert 'rules' not in incremental['avm-res-keyvault-vault']['variables']['name']
+
+    assert_same_as_full_run(incremental, run_tool(local_mirror.source()))
+
+def test_changed_azurerm_mapping_rebuilds_every_module(local_mirror, run_tool, tmp_path, monkeypatch):
+    write_modules(local_mirror, ['name', 'resource_id', 'vault_uri'])
+    mapping_file_path = tmp_path / 'azurerm_to_avm.json'
+    with open(AZURERM_TO_AVM_FILE_PATH, 'r', encoding='utf-8') as f:
+        mapping = json.load(f)
+    mapping_file_path.write_text(json.dumps(mapping))
+    monkeypatch.setattr(manifest, 'AZURERM_TO_AVM_FILE_PATH', str(mapping_file_path))
+    monkeypatch.setattr(variable_parser, 'AZURERM_TO_AVM_FILE_PATH', str(mapping_file_path))
+    assert run_tool(local_mirror.source())['avm-res-storage-storageaccount']['denpends_on']['avm_depends_on'] == ['avm-res-keyvault-vault']
+
+    # no module changed, only what the examples render to
+    del mapping['azurerm_key_vault']
+    mapping_file_path.write_text(json.dumps(mapping))
+    incremental = run_tool(local_mirror.source(), incremental=True)
+    assert incremental['avm-res-storage-storageaccount']['denpends_on']['avm_depends_on'] == []
+
+    assert_same_as_full_run(incremental, run_tool(local_mirror.source()))
@@ -0,0 +1,79 @@
+import asyncio
+
+import pytest
+
+from tool import pipeline
+from tool.data_loader import load_modules_info
+from tool.data_parser import hcl_pool
+from tool.data_parser.variable_parser import VariableParser
+from tool.manifest import Manifest
+from tool.pipeline import ModulePipeline, build_data
+from .test_incremental import write_modules
+
+KEY_VAULT = 'avm-res-keyvault-vault'
+STORAGE = 'avm-res-storage-storageaccount'
+RESOURCE_GROUP = 'avm-res-resources-resourcegroup'
+
+def fail_outputs_of(monkeypatch, failing_module: str):
+    parse = pipeline.parse_module_outputs
+
+    async def parse_module_outputs(module: dict) -> dict:
+        if module['module_name'] == failing_module:
+            raise RuntimeError('broken outputs')
+        return await parse(module)
+    monkeypatch.setattr(pipeline, 'parse_module_outputs', parse_module_outputs)
+
+def run_pipeline(source) -> ModulePipeline:
+    async def run():
+        async with source:
+            data = await load_modules_info(source)
+            releases = await source.latest_releases(data)
+            module_pipeline = ModulePipeline(data, source, releases, Manifest())
+            try:
+                await module_pipeline.run(list(data))
+            finally:
+                hcl_pool.shutdown()
+            return module_pipeline
+    return asyncio.run(run())
+
+def test_failed_module_fails_the_modules_whose_examples_refer_to_it(local_mirror, monkeypatch):
+    write_modules(local_mirror, ['name', 'resource_id', 'vault_uri'])
+    fail_outputs_of(monkeypatch, KEY_VAULT)
+
+    module_pipeline = run_pipeline(local_mirror.source())
+    assert sorted(module_pipeline.failed_modules) == [KEY_VAULT, STORAGE]
+    assert str(module_pipeline.failed_modules[KEY_VAULT]) == 'broken outputs'
+    assert str(module_pipeline.failed_modules[STORAGE]) == f'Depends on failed modules: {KEY_VAULT}'
+    assert 'variables' in module_pipeline.data[RESOURCE_GROUP]
+
+def test_module_failing_after_its_outputs_were_used_fails_its_dependents(local_mirror, monkeypatch):
+    write_modules(local_mirror, ['name', 'resource_id', 'vault_uri'])
+    parse = VariableParser.parse
+
+    async def parse_variables(self, module_name: str) -> dict:
+        if module_name == KEY_VAULT:
+            # storage parses its variables from the key vault outputs in the meantime
+            await asyncio.sleep(0.5)
+            raise RuntimeError('broken variables')
+        return await parse(self, module_name)
+    monkeypatch.setattr(VariableParser, 'parse', parse_variables)
+
+    module_pipeline = run_pipeline(local_mirror.source())
+    assert sorted(module_pipeline.failed_modules) == [KEY_VAULT, STORAGE]
+    assert str(module_pipeline.failed_modules[STORAGE]) == f'Depends on failed modules: {KEY_VAULT}'
+
+def test_full_run_fails_when_a_module_fails(local_mirror, monkeypatch):
+    write_modules(local_mirror, ['name', 'resource_id', 'vault_uri'])
+    fail_outputs_of(monkeypatch, KEY_VAULT)
+
+    with pytest.raises(Exception, match=f'no previous data to keep: {KEY_VAULT}: broken outputs; {STORAGE}: Depends on failed modules'):
+        asyncio.run(build_data(Manifest(), {}, local_mirror.source()))
+
+def test_incremental_run_keeps_the_previous_data_of_failed_modules(local_mirror, run_tool, monkeypatch):
+    write_modules(local_mirror, ['name', 'resource_id'])
+    before = run_tool(local_mirror.source())
+
+    write_modules(local_mirror, ['name', 'resource_id', 'vault_uri'])
+    fail_outputs_of(monkeypatch, KEY_VAULT)
+    after = run_tool(local_mirror.source(), incremental=True)
+    assert after == before
@@ -0,0 +1,149 @@
+import asyncio
+import contextlib
+import functools
+import time
+
+from tool import utils
+from tool.utils import AdaptiveLimit, TaskRunner, paused_timeout
+
+def test_run_keeps_the_input_order():
+    async def task(delay: float, value: int) -> int:
+        await asyncio.sleep(delay)
+        return value
+
+    tasks = [functools.partial(task, 0.05 * (5 - index), index) for index in range(5)]
+    outcomes = asyncio.run(TaskRunner(3).run(tasks))
+    assert [outcome.result for outcome in outcomes] == [0, 1, 2, 3, 4]
+    assert [outcome.index for outcome in outcomes] == [0, 1, 2, 3, 4]
+
+def test_retries_double_the_delay(monkeypatch):
+    delays = []
+    sleep = asyncio.sleep
+
+    async def record_sleep(delay, *args, **kwargs):
+        delays.append(delay)
+        await sleep(0)
+    monkeypatch.setattr(utils.asyncio, 'sleep', record_sleep)
+
+    calls = []
+
+    async def flaky():
+        calls.append(None)
+        if len(calls) < 4:
+            raise ValueError('flaky')
+        return 'done'
+
+    outcome = asyncio.run(TaskRunner(retries=3, retry_delay=0.5).call(flaky))
+    assert outcome.result == 'done' and outcome.error is None
+    assert outcome.attempts == 4
+    assert delays == [0.5, 1.0, 2.0]
+
+def test_errors_are_collected_without_stopping_the_other_tasks():
+    def task(index: int) -> int:
+        if index % 2:
+            raise ValueError(f'odd {index}')
+        return index
+
+    runner = TaskRunner(2)
+    outcomes = asyncio.run(runner.run([lambda index=index: task(index) for index in range(6)]))
+    assert [outcome.result for outcome in outcomes] == [0, None, 2, None, 4, None]
+    assert sorted(outcome.index for outcome in runner.errors) == [1, 3, 5]
+    assert sorted(str(outcome.error) for outcome in runner.errors) == ['odd 1', 'odd 3', 'odd 5']
+
+def test_timed_out_thread_is_not_retried():
+    calls = []
+
+    def slow():
+        calls.append(None)
+        time.sleep(0.3)
+
+    outcome = asyncio.run(TaskRunner(timeout=0.05, retries=2, retry_delay=0).call(slow))
+    time.sleep(0.4)  # the thread keeps running after the timeout
+    assert isinstance(outcome.error, TimeoutError)
+    assert outcome.attempts == 1
+    assert len(calls) == 1
+
+def test_timed_out_coroutine_is_retried():
+    calls = []
+
+    async def slow():
+        calls.append(None)
+        await asyncio.sleep(1)
+
+    outcome = asyncio.run(TaskRunner(timeout=0.05, retries=2, retry_delay=0).call(slow))
+    assert isinstance(outcome.error, TimeoutError)
+    assert outcome.attempts == 3
+    assert len(calls) == 3
+
+def test_timeout_raised_by_the_task_is_not_a_runner_timeout():
+    def task():
+        raise TimeoutError('from the task')
+
+    outcome = asyncio.run(TaskRunner(timeout=5, retries=1, retry_delay=0).call(task))
+    assert str(outcome.error) == 'from the task'
+    assert outcome.attempts == 2
+
+def test_paused_timeout_excludes_the_block_from_the_timeout():
+    async def waits_for_a_rate_limit():
+        await asyncio.sleep(0.1)
+        async with paused_timeout():
+            async with paused_timeout():
+                await asyncio.sleep(0.4)
+        await asyncio.sleep(0.1)
+        return 'done'
+
+    async def slow():
+        await asyncio.sleep(0.4)
+
+    outcome = asyncio.run(TaskRunner(timeout=0.3).call(waits_for_a_rate_limit))
+    assert outcome.result == 'done' and outcome.error is None
+    outcome = asyncio.run(TaskRunner(timeout=0.3).call(slow))
+    assert isinstance(outcome.error, TimeoutError)
+
+def test_paused_timeout_outside_of_a_runner_does_nothing():
+    async def run():
+        async with paused_timeout():
+            await asyncio.sleep(0)
+        return 'done'
+
+    assert asyncio.run(run()) == 'done'
+
+def test_as_completed_stops_when_the_consumer_leaves():
+    started = []
+    cancelled = []
+
+    async def task(index: int):
+        started.append(index)
+        try:
+            await asyncio.sleep(0 if index == 0 else 10)
+        except asyncio.CancelledError:
+            cancelled.append(index)
+            raise
+        return index
+
+    async def consume():
+        tasks = (functools.partial(task, index) for index in range(10))
+        async with contextlib.aclosing(TaskRunner(3).as_completed(tasks)) as outcomes:
+            async for outcome in outcomes:
+                break
+        await asyncio.sleep(0.1)
+        return outcome
+
+    outcome = asyncio.run(consume())
+    assert outcome.result == 0
+    # only the tasks within the limit ever started, those still running were cancelled
+    assert sorted(started) == [0, 1, 2]
+    assert sorted(cancelled) == [1, 2]
+
+def test_adaptive_limit_stays_within_its_bounds():
+    limit = AdaptiveLimit(4, 8, minimum=2)
+    seen = []
+    for _ in range(20):
+        limit.record(0.01)
+        seen.append(limit.limit)
+    assert max(seen) == 8
+    for latency in range(1, 20):
+        limit.record(float(latency))
+        seen.append(limit.limit)
+    assert min(seen) == 2
+    assert all(2 <= value <= 8 for value in seen)
@@ -0,0 +1,36 @@
+import json
+import os
+
+import pytest
+
+from tool.data_parser.variable_parser import RootNode, create_variable_node
+
+# Every distinct variable schema of data/avm_data.json with a variable type and example value that render it.
+# `schema` is the expected terraform fmt text. Entries published before the schemas were rendered in that layout also
+# keep the `published` text, which differs only in the indentation of its lines.
+CORPUS_FILE_PATH = os.path.join(os.path.dirname(__file__), 'data', 'variable_schemas.jsonl')
+
+def load_corpus() -> list[dict]:
+    with open(CORPUS_FILE_PATH, 'r', encoding='utf-8') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+CORPUS = load_corpus()
+
+def entry_id(entry: dict) -> str:
+    return f"{entry['module']}.{entry['variable']}"
+
+def render(entry: dict) -> str:
+    data = {'type': entry['type']}
+    if not entry['required']:
+        data['default'] = None
+    variable_node = create_variable_node(entry['variable'], data, RootNode(entry['module'], ''))
+    variable_node.set_value(entry['value'])
+    return variable_node.to_module()
+
+@pytest.mark.parametrize('entry', CORPUS, ids=entry_id)
+def test_schema_renders_as_expected(entry):
+    assert render(entry) == entry['schema']
+
+@pytest.mark.parametrize('entry', [entry for entry in CORPUS if 'published' in entry], ids=entry_id)
+def test_published_schema_only_changes_indentation(entry):
+    assert [line.lstrip() for line in entry['schema'].split('\n')] == [line.lstrip() for line in entry['published'].split('\n')]
@@ -1,31 +1,81 @@
-import asyncio
-import shutil
-import os
-import json
-import logging
-
-from .data_loader import load_data
-from .data_parser.parse_data import parse_data
-from .dependency_generator import generate as generate_dependencies
-from .rule_generator import generate as generate_rules
-from .utils import DATA_DIRECTORY_PATH, ORIGIN_DATA_FILE_PATH
-
-async def main():
-    if os.path.exists(DATA_DIRECTORY_PATH):
-        shutil.rmtree(DATA_DIRECTORY_PATH)
-    
-    os.makedirs(DATA_DIRECTORY_PATH, exist_ok=True)
-
-    data = await load_data()
-    await parse_data(data)
-    await generate_dependencies(data)
-    generate_rules(data)
-
-    with open(ORIGIN_DATA_FILE_PATH, 'w', encoding='utf-8') as f:
-        f.write(json.dumps(data, indent=4))
-
-    # generate questions and check list
-
-if __name__ == "__main__":
-    logging.basicConfig(level=logging.INFO)
-    asyncio.run(main())
\ No newline at end of file
+import argparse
+import asyncio
+import shutil
+import os
+import json
+import logging
+
+from .data_writer import write_data
+from .dependency_generator import generate as generate_dependencies
+from .manifest import Manifest, load_previous_data
+from .module_index import write_module_index
+from .pipeline import build_data
+from .rule_generator import generate as generate_rules
+from .sources import GitHubSource, LocalSource, SourceProvider
+from .text_table import load_text_table, resolve_texts, share_texts
+from .type_table import load_type_table, resolve_type_subtrees, share_type_subtrees
+from .utils import DATA_DIRECTORY_PATH, MANIFEST_FILE_PATH, MODULE_INDEX_FILE_PATH, MODULES_FILE_PATH, ORIGIN_DATA_FILE_PATH, TEXT_TABLE_FILE_PATH, TYPE_TABLE_FILE_PATH
+
+def write_table(file_path: str, table: dict):
+    with open(file_path, 'w', encoding='utf-8') as f:
+        f.write(json.dumps(table, indent=4))
+
+def remove_file(file_path: str):
+    if os.path.exists(file_path):
+        os.remove(file_path)
+
+async def main(incremental: bool = False, source: SourceProvider = None, type_table: bool = False, text_table: bool = False, module_index: bool = False):
+    if os.path.exists(DATA_DIRECTORY_PATH):
+        shutil.rmtree(DATA_DIRECTORY_PATH)
+    
+    os.makedirs(DATA_DIRECTORY_PATH, exist_ok=True)
+
+    manifest = Manifest.load(MANIFEST_FILE_PATH) if incremental else Manifest()
+    # the previous data is only reused together with a manifest of the same data format
+    previous_data = load_previous_data(ORIGIN_DATA_FILE_PATH) if manifest.modules else {}
+    resolve_type_subtrees(previous_data, load_type_table(TYPE_TABLE_FILE_PATH))
+    resolve_texts(previous_data, load_text_table(TEXT_TABLE_FILE_PATH))
+
+    data = await build_data(manifest, previous_data, source)
+    await generate_dependencies(data, manifest.changed_modules, previous_data)
+    generate_rules(data)
+
+    if type_table:
+        write_table(TYPE_TABLE_FILE_PATH, share_type_subtrees(data))
+    else:
+        remove_file(TYPE_TABLE_FILE_PATH)
+    if text_table:
+        write_table(TEXT_TABLE_FILE_PATH, share_texts(data))
+    else:
+        remove_file(TEXT_TABLE_FILE_PATH)
+    if module_index:
+        write_module_index(data, MODULES_FILE_PATH, MODULE_INDEX_FILE_PATH)
+    else:
+        remove_file(MODULES_FILE_PATH)
+        remove_file(MODULE_INDEX_FILE_PATH)
+
+    manifest.record_content(write_data(data, ORIGIN_DATA_FILE_PATH, manifest.content_hashes()))
+    manifest.save(MANIFEST_FILE_PATH)
+
+    # generate questions and check list
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(prog='python -m tool')
+    parser.add_argument('--incremental', action='store_true', help='only refresh modules whose release changed since the previous run')
+    parser.add_argument('--type-table', action='store_true', help='store variable type trees once in data/avm_types.json and refer to them by key')
+    parser.add_argument('--text-table', action='store_true', help='store variable schemas and descriptions once in data/avm_texts.json and refer to them by key')
+    parser.add_argument('--module-index', action='store_true', help='also write data/avm_modules.jsonl, one compact module per line, indexed by byte offset in data/avm_modules_index.json')
+    parser.add_argument('--source', choices=['github', 'local'], default='github', help='where to load the module index and the modules from')
+    parser.add_argument('--index', help='module index CSV of the local mirror, required with --source local')
+    parser.add_argument('--mirror', help='directory of module tarballs or checked-out repositories, required with --source local')
+    args = parser.parse_args()
+
+    if args.source == 'local':
+        if not args.index or not args.mirror:
+            parser.error('--source local requires --index and --mirror')
+        source = LocalSource(args.index, args.mirror)
+    else:
+        source = GitHubSource()
+
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(main(args.incremental, source, args.type_table, args.text_table, args.module_index))
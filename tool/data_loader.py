@@ -1,146 +1,86 @@
-
-import asyncio
-import csv
-import io
-import json
-import logging
-import os
-import requests
-import shutil
-import tarfile
-import time
-
-from .utils import AVAILABLE_MODULES_URL, DATA_DIRECTORY_PATH, DOWNLOADED_TAR_PATH, run_tasks, raise_error
-
-def _source_from_repo_url(repo_url: str) -> str:
-        _, first_part, other_parts = repo_url.rsplit('/', 2)
-        _, third_part,second_part = other_parts.split('-', 2)
-        return f"{first_part}/{second_part}/{third_part}"
-
-def load_modules_info() -> dict[str, dict]:  
-    logging.info("Loading modules info from AVM official website...")
-    response = requests.get(AVAILABLE_MODULES_URL)
-    response.raise_for_status()
-    csv_content = response.text
-
-    dict_reader = csv.DictReader(io.StringIO(csv_content))
-    modules_info = {}
-
-    for row in dict_reader:
-        if row['ModuleStatus'] == 'Proposed':
-            continue
-
-        module_name = row['ModuleName']
-        display_name = row['ModuleDisplayName']
-        repo_url = row['RepoURL']
-        modules_info[module_name] = {
-            "module_name": module_name,
-            "display_name": display_name,
-            "source": _source_from_repo_url(repo_url),
-            "git_hub_url": repo_url,
-            "description": f"Manages {display_name}.",
-        }
-        
-        logging.info(f"load module info: Module Name: {module_name}")                                            
-                    
-    return modules_info 
-
-def get_tarball_url(module: dict, headers: dict) -> str:
-    response = requests.get('/'.join([module["git_hub_url"].replace("github.com", "api.github.com/repos"),'releases', 'latest']), headers=headers)
-    if response.status_code == 200:
-        release_info = response.json()
-        if 'tarball_url' in release_info:
-            return release_info['tarball_url']
-    
-    response = requests.get('/'.join([module["git_hub_url"].replace("github.com", "api.github.com/repos"),'releases']), headers=headers)
-    release_info_list = response.json()
-    if len(release_info_list) > 0:
-        release_info = release_info_list[0]
-        if 'tarball_url' in release_info:
-            return release_info['tarball_url']
-    
-    response = requests.get('/'.join([module["git_hub_url"].replace("github.com", "api.github.com/repos"),'tags']), headers=headers)
-    release_info_list = response.json()
-    if len(release_info_list) > 0:
-        release_info = release_info_list[0]
-        if 'tarball_url' in release_info:
-            return release_info['tarball_url']
-
-    raise_error(f"Failed to get tarball URL for module {module['module_name']}. Please check the module's GitHub repository.")
- 
-def retrieve_the_latest_version_module(module: dict, headers: dict):
-    logging.info("Downloading the latest version of module: %s", module['module_name'])
-    extract_to = os.path.join(DATA_DIRECTORY_PATH, module['module_name'])
-    dest_path = os.path.join(DOWNLOADED_TAR_PATH, f"{module['module_name']}.tar.gz")
-
-    # Download the package
-    try:
-        if not os.path.exists(dest_path):
-            tarball_url = get_tarball_url(module, headers)
-            response = requests.get(tarball_url, stream=True, headers=headers)
-            response.raise_for_status()
-            with open(dest_path, "wb") as file:
-                for chunk in response.iter_content(chunk_size=8192):
-                    file.write(chunk)
-    except Exception as e:
-        raise_error(f"Failed to download module {module['module_name']}: {e}")
-    
-    # Extract the downloaded file
-    if os.path.exists(extract_to):
-        shutil.rmtree(extract_to)
-    os.makedirs(extract_to, exist_ok=True)
-    with tarfile.open(dest_path, "r:gz") as tar:
-        # Run this command to avoid Windows length limitation: Set-ItemProperty -Path "HKLM:\SYSTEM\CurrentControlSet\Control\FileSystem" -Name "LongPathsEnabled" -Value 1
-        tar.extractall(path=extract_to)
-    
-    # re-organize the directory structure
-    if len(os.listdir(extract_to)) == 1:
-        src = os.path.join(extract_to, os.listdir(extract_to)[0])
-        if os.path.isdir(src):
-            for entry in os.listdir(src):
-                shutil.move(os.path.join(src, entry), extract_to)
-            shutil.rmtree(src)
-
-async def retrieve_the_latest_version_modules(modules_info: dict[str, dict]):
-    os.environ['PYTHONUTF8'] = '1'  # Enable UTF-8 mode
-    os.makedirs(DOWNLOADED_TAR_PATH, exist_ok=True)
-    
-    token = os.getenv('GITHUB_TOKEN')
-    if not token:
-        raise_error("GITHUB_TOKEN environment variable is not set. Please set it to your GitHub token.")
-
-    headers = {
-        "Accept": "application/vnd.github.v3+json",
-        "X-GitHub-Api-Version": "2022-11-28",
-        "Authorization": f"Bearer {os.getenv('GITHUB_TOKEN')}"
-    }
-    
-    tasks = []
-    for module in modules_info:
-        tasks.append(lambda x=modules_info[module]: retrieve_the_latest_version_module(x, headers))
-    await run_tasks(tasks, 10)
-
-
-
-async def load_data() -> dict[str, dict]:
-    try:
-        data = load_modules_info()
-    except Exception as e:
-        raise_error(f"Failed to load modules info: {e}")
-    
-    try:
-        await retrieve_the_latest_version_modules(data)
-    except Exception as e:
-        raise_error(f"Failed to retrieve the latest version: {e}")
-    
-    return data
-
-async def main():
-    from utils import DEBUG_DATA_FILE_PATH
-    data = await load_data()
-    with open(DEBUG_DATA_FILE_PATH, 'w', encoding='utf-8') as f:
-        f.write(json.dumps(data, indent=4))
-if __name__ == "__main__":
-    logging.basicConfig(level=logging.INFO)
-    asyncio.run(main())
-    
+import asyncio
+import csv
+import io
+import logging
+import os
+
+from .manifest import Manifest, hash_module_inputs
+from .sources import SourceProvider
+from .utils import DATA_DIRECTORY_PATH, HTTP_PER_HOST_CONCURRENCY, REUSED_MODULE_KEYS, TASK_TIMEOUT, TaskRunner, raise_error
+
+def _source_from_repo_url(repo_url: str) -> str:
+        _, first_part, other_parts = repo_url.rsplit('/', 2)
+        _, third_part,second_part = other_parts.split('-', 2)
+        return f"{first_part}/{second_part}/{third_part}"
+
+async def load_modules_info(source: SourceProvider) -> dict[str, dict]:  
+    csv_content = await source.load_index()
+
+    dict_reader = csv.DictReader(io.StringIO(csv_content))
+    modules_info = {}
+
+    for row in dict_reader:
+        if row['ModuleStatus'] == 'Proposed':
+            continue
+
+        module_name = row['ModuleName']
+        display_name = row['ModuleDisplayName']
+        repo_url = row['RepoURL']
+        modules_info[module_name] = {
+            "module_name": module_name,
+            "display_name": display_name,
+            "source": _source_from_repo_url(repo_url),
+            "git_hub_url": repo_url,
+            "description": f"Manages {display_name}.",
+        }
+        
+        logging.info(f"load module info: Module Name: {module_name}")                                            
+                    
+    return modules_info 
+
+async def retrieve_module(source: SourceProvider, module: dict, release: dict, manifest: Manifest) -> bool:
+    """Retrieve one module into the data directory, record it in the manifest and return whether its parser inputs changed."""
+    module_name = module['module_name']
+    extract_to = os.path.join(DATA_DIRECTORY_PATH, module_name)
+    tarball_sha256 = await source.retrieve_module(module, release, extract_to)
+    manifest.record_release(module_name, release, tarball_sha256)
+    return manifest.record_inputs(module_name, await asyncio.to_thread(hash_module_inputs, extract_to))
+
+def retrieval_runner() -> TaskRunner:
+    # downloads share the per-host limit of the HTTP client, the runner backs off further when they slow down.
+    # GitHubClient already retries failed requests, a module is not retrieved again on top of that.
+    return TaskRunner(HTTP_PER_HOST_CONCURRENCY, timeout=TASK_TIMEOUT, adaptive=True)
+
+def reuse_previous_data(data: dict[str, dict], previous_data: dict[str, dict], module_names):
+    for module_name in module_names:
+        for key in REUSED_MODULE_KEYS:
+            if key in previous_data[module_name]:
+                data[module_name][key] = previous_data[module_name][key]
+        # the rule generator only adds rules, a rule removed from rules.json must not survive in reused variables
+        if 'variables' in data[module_name]:
+            data[module_name]['variables'] = {k: {vk: vv for vk, vv in v.items() if vk != 'rules'} for k, v in data[module_name]['variables'].items()}
+
+def finish_loading(data: dict[str, dict], manifest: Manifest, previous_data: dict[str, dict], stale_modules: set[str], inputs_changed: set[str],
+                   failed_modules: dict[str, BaseException] = None):
+    """
+    Decide which of the retrieved modules changed, every other module keeps its previous outputs, variables and dependencies.
+    A module that failed to be retrieved or parsed keeps its previous data, or is left out when there is none,
+    and is retrieved again by the next incremental run. A run without any previous data, a full run, fails instead:
+    the data it writes would silently lack the failed modules.
+    """
+    failed_modules = failed_modules or {}
+    if failed_modules and not previous_data:
+        raise_error(f"Modules failed and there is no previous data to keep: {'; '.join(f'{k}: {v}' for k, v in sorted(failed_modules.items()))}")
+    for module_name, error in failed_modules.items():
+        manifest.forget(module_name)
+        if module_name in previous_data:
+            logging.error(f"Keeping the previous data of module {module_name}: {error}")
+        else:
+            logging.error(f"Leaving out module {module_name}: {error}")
+            del data[module_name]
+
+    retrieved = {k for k in stale_modules if k not in failed_modules}
+    manifest.plan_changes({k for k in inputs_changed if k in retrieved}, retrieved, previous_data, data.keys())
+    manifest.retain(data.keys())
+    reuse_previous_data(data, previous_data, [k for k in data if k not in manifest.changed_modules])
+    logging.info(f"{len(manifest.changed_modules)} of {len(data)} modules changed since the previous run.")
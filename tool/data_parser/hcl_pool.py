@@ -0,0 +1,76 @@
+import asyncio
+import hashlib
+import logging
+import marshal
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+
+import hcl2
+from hcl2.parser import parser
+
+from ..file_cache import FileCache
+from ..utils import HCL_PARSER_WORKERS, PARSE_CACHE_MAX_SIZE, PARSE_CACHE_PATH, raise_error
+
+# parsed files are cached by content, the key changes with python-hcl2 and the serialization format
+_CACHE_VERSION = f"hcl2-{hcl2.__version__}/marshal-{marshal.version}"
+
+_executor: ProcessPoolExecutor = None
+_cache = FileCache(PARSE_CACHE_PATH, PARSE_CACHE_MAX_SIZE)
+
+def _warm_up():
+    # build the Lark grammar once per worker, every later hcl2.loads reuses it
+    parser()
+
+def _loads(text: str, with_meta: bool) -> dict:
+    try:
+        return hcl2.loads(text, with_meta)
+    except Exception as e:
+        # Lark exceptions do not always survive pickling back to the parent process
+        raise_error(f"{type(e).__name__}: {e}")
+
+def _get_executor() -> ProcessPoolExecutor:
+    global _executor
+    if _executor is None:
+        logging.info(f"Starting {HCL_PARSER_WORKERS} HCL parser workers")
+        _executor = ProcessPoolExecutor(max_workers=HCL_PARSER_WORKERS, initializer=_warm_up)
+    return _executor
+
+def _cache_key(text: str, with_meta: bool) -> str:
+    return f"{_CACHE_VERSION}/{with_meta}/{hashlib.sha256(text.encode('utf-8')).hexdigest()}"
+
+def _read_cache(key: str) -> dict:
+    data = _cache.get_bytes(key)
+    if data is None:
+        return None
+    try:
+        return marshal.loads(zlib.decompress(data))
+    except Exception as e:
+        logging.warning(f"Ignoring unreadable parse cache entry {key}: {e}")
+        return None
+
+def _write_cache(key: str, result: dict):
+    _cache.put_bytes(key, zlib.compress(marshal.dumps(result)))
+
+async def loads(text: str, with_meta: bool = False) -> dict:
+    """
+    `hcl2.loads` in a pool of worker processes, or in a thread when HCL_PARSER_WORKERS is 0.
+    Results are cached on disk by the hash of `text`.
+    """
+    key = _cache_key(text, with_meta)
+    result = await asyncio.to_thread(_read_cache, key)
+    if result is not None:
+        return result
+
+    if HCL_PARSER_WORKERS <= 0:
+        result = await asyncio.to_thread(_loads, text, with_meta)
+    else:
+        result = await asyncio.get_running_loop().run_in_executor(_get_executor(), _loads, text, with_meta)
+    await asyncio.to_thread(_write_cache, key, result)
+    return result
+
+def shutdown():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown()
+        _executor = None
+    _cache.evict()
@@ -0,0 +1,59 @@
+def indent(depth: int) -> str:
+    return '  ' * depth
+
+class ModuleWriter:
+    """
+    Output buffer shared by every node of a tree while it renders, so each schema is produced in one pass.
+
+    Nodes write their tokens and mark brackets with `open` / `close`; when a line ends, the writer indents it
+    like `terraform fmt` does: a line that opens brackets is indented at the current level and pushes one level,
+    however many brackets it opens (`[{`), and a line that closes brackets pops the levels it closes first.
+    """
+    __slots__ = ('_parts', '_line', '_line_brackets', '_indents')
+
+    def __init__(self):
+        self._parts: list[str] = []
+        self._line: list[str] = []
+        self._line_brackets = 0
+        self._indents: list[int] = []
+
+    def write(self, text: str):
+        self._line.append(text)
+
+    def open(self, bracket: str):
+        self._line.append(bracket)
+        self._line_brackets += 1
+
+    def close(self, bracket: str):
+        self._line.append(bracket)
+        self._line_brackets -= 1
+
+    def newline(self):
+        self._flush_line()
+        self._parts.append('\n')
+
+    def _flush_line(self):
+        if not self._line:
+            return
+
+        net_brackets = self._line_brackets
+        if net_brackets > 0:
+            self._parts.append(indent(len(self._indents)))
+            self._indents.append(net_brackets)
+        else:
+            closed = -net_brackets
+            while closed > 0 and self._indents:
+                if closed >= self._indents[-1]:
+                    closed -= self._indents.pop()
+                else:
+                    self._indents[-1] -= closed
+                    closed = 0
+            self._parts.append(indent(len(self._indents)))
+
+        self._parts.extend(self._line)
+        self._line.clear()
+        self._line_brackets = 0
+
+    def getvalue(self) -> str:
+        self._flush_line()
+        return ''.join(self._parts)
@@ -0,0 +1,182 @@
+import functools
+import re
+from typing import NamedTuple, Union
+
+# Terraform type constraints as python-hcl2 renders them, e.g.
+#   ${map(object({"name": "string", "tags": "${optional(map(string), {})}", "kind": "${optional(string, "None")}"}))}
+# The nested quotes are not escaped, so `"` is read as punctuation, and default values are
+# kept as the raw text between the `,` and the closing `)` of `optional(...)`.
+_TOKEN_PATTERN = re.compile(r'\$\{|\\.|[(){}\[\],:"]|[^\s(){}\[\],:"\\$]+|[\\$]')
+
+_OPENERS = ('${', '(', '[', '{')
+_CLOSERS = (')', ']', '}')
+
+PRIMITIVE_TYPES = ('string', 'number', 'bool', 'any', 'unknown')
+COLLECTION_TYPES = ('list', 'set', 'map')
+
+class PrimitiveType(NamedTuple):
+    name: str
+
+class CollectionType(NamedTuple):
+    kind: str
+    element: 'TypeExpression'
+
+class ObjectAttribute(NamedTuple):
+    name: str
+    type: 'TypeExpression'
+    required: bool
+    default: str
+
+class ObjectType(NamedTuple):
+    attributes: tuple[ObjectAttribute, ...]
+
+TypeExpression = Union[PrimitiveType, CollectionType, ObjectType]
+
+class _TypeParser:
+    """Recursive-descent parser over the tokens of one type string, every token is visited once."""
+    def __init__(self, text: str):
+        self.text = text
+        self.tokens = [(m.group(), m.start()) for m in _TOKEN_PATTERN.finditer(text)]
+        self.position = 0
+
+    def _error(self, message: str):
+        offset = self.tokens[self.position][1] if self.position < len(self.tokens) else len(self.text)
+        raise ValueError(f"{message} at position {offset}: {self.text}")
+
+    def _peek(self) -> str:
+        return self.tokens[self.position][0] if self.position < len(self.tokens) else None
+
+    def _next(self) -> str:
+        token = self._peek()
+        if token is None:
+            self._error("Unexpected end of type")
+        self.position += 1
+        return token
+
+    def _expect(self, expected: str):
+        if self._peek() != expected:
+            self._error(f"Expected '{expected}'")
+        self.position += 1
+
+    def _accept(self, expected: str) -> bool:
+        if self._peek() == expected:
+            self.position += 1
+            return True
+        return False
+
+    def parse(self) -> TypeExpression:
+        result = self._parse_type()
+        if self.position != len(self.tokens):
+            self._error("Unexpected trailing text")
+        return result
+
+    def _parse_type(self, attribute: bool = False):
+        if self._accept('${'):
+            result = self._parse_type(attribute)
+            self._expect('}')
+            return result
+
+        name = self._next()
+        if name in PRIMITIVE_TYPES:
+            return PrimitiveType(name)
+        if name in COLLECTION_TYPES:
+            self._expect('(')
+            element = self._parse_type()
+            self._expect(')')
+            return CollectionType(name, element)
+        if name == 'object':
+            return self._parse_object()
+        if name == 'optional' and attribute:
+            self._expect('(')
+            value_type = self._parse_type()
+            default = self._parse_default() if self._accept(',') else ''
+            self._expect(')')
+            return ObjectAttribute('', value_type, False, default)
+
+        self.position -= 1
+        self._error(f"Unsupported data type '{name}'")
+
+    def _parse_object(self) -> ObjectType:
+        self._expect('(')
+        self._expect('{')
+        attributes = []
+        while not self._accept('}'):
+            if attributes:
+                self._expect(',')
+            attributes.append(self._parse_attribute())
+        self._expect(')')
+        return ObjectType(tuple(attributes))
+
+    def _parse_attribute(self) -> ObjectAttribute:
+        quoted = self._accept('"')
+        name = self._next()
+        if quoted:
+            self._expect('"')
+        self._expect(':')
+
+        quoted = self._accept('"')
+        value = self._parse_type(attribute=True)
+        if quoted:
+            self._expect('"')
+
+        if isinstance(value, ObjectAttribute):
+            return value._replace(name=name)
+        return ObjectAttribute(name, value, True, '')
+
+    def _parse_default(self) -> str:
+        """Raw text of a default value, up to the `)` closing the enclosing `optional(`."""
+        start = self.position
+        depth = 0
+        quoted = False
+        while True:
+            token = self._peek()
+            if token is None:
+                self._error("Unterminated default value")
+            if token == '"':
+                quoted = not quoted
+            elif not quoted and token in _OPENERS:
+                depth += 1
+            elif not quoted and token in _CLOSERS:
+                if depth == 0:
+                    break
+                depth -= 1
+            self.position += 1
+
+        if start == self.position:
+            return ''
+        return self.text[self.tokens[start][1]:self.tokens[self.position][1]].strip()
+
+@functools.lru_cache(maxsize=None)
+def _parse_template(text: str) -> TypeExpression:
+    return _TypeParser(text).parse()
+
+def parse_type(text: str) -> TypeExpression:
+    """
+    Parse a variable `type` as python-hcl2 renders it into a typed tree.
+    python-hcl2 renders equal types to equal strings, so the trees are interned by the stripped text: the shared
+    interface variables (tags, lock, role_assignments, ...) are parsed once per run and every variable of that type
+    instantiates its value nodes from the same immutable template.
+    """
+    return _parse_template(text.strip())
+
+def type_cache_info():
+    return _parse_template.cache_info()
+
+def type_to_json(type_expression: TypeExpression):
+    """
+    Compact JSON form of a type: a primitive is its name, a collection is `{"list" | "set" | "map": element}`
+    and an object is `{"object": {name: {"type": ..., "required": bool, "default": raw HCL text}}}`
+    in declaration order, with `default` only present when the type declares one.
+    """
+    if isinstance(type_expression, PrimitiveType):
+        return type_expression.name
+    if isinstance(type_expression, CollectionType):
+        return {type_expression.kind: type_to_json(type_expression.element)}
+
+    attributes = {}
+    for attribute in type_expression.attributes:
+        encoded = {'type': type_to_json(attribute.type), 'required': attribute.required}
+        if attribute.default:
+            encoded['default'] = attribute.default
+        attributes[attribute.name] = encoded
+    return {'object': attributes}
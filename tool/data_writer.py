@@ -0,0 +1,40 @@
+import hashlib
+import json
+import logging
+import os
+
+def encode_module(module: dict) -> bytes:
+    """Compact JSON of a module, the content hashes are computed over these bytes."""
+    return json.dumps(module, separators=(',', ':')).encode('utf-8')
+
+def module_sha256(module: dict) -> str:
+    return hashlib.sha256(encode_module(module)).hexdigest()
+
+def write_data(data: dict[str, dict], file_path: str, previous_hashes: dict[str, str] = None) -> dict[str, str]:
+    """
+    Stream `data` to `file_path` one module at a time, in module name order, with the layout of `json.dump(data, indent=4)`,
+    and return the content hash of every module. The file is left untouched when it exists and every hash matches
+    `previous_hashes`.
+    """
+    hashes = {}
+    part_path = f"{file_path}.part"
+    with open(part_path, 'w', encoding='utf-8') as f:
+        f.write('{')
+        for i, module_name in enumerate(sorted(data)):
+            module = data[module_name]
+            hashes[module_name] = module_sha256(module)
+            # JSON strings never hold a raw newline, so indenting every line nests the module one level down
+            f.write(',\n    ' if i else '\n    ')
+            f.write(json.dumps(module_name))
+            f.write(': ')
+            f.write(json.dumps(module, indent=4).replace('\n', '\n    '))
+        f.write('\n}' if hashes else '}')
+
+    if hashes == previous_hashes and os.path.exists(file_path):
+        logging.info(f"No module changed, keeping {file_path}")
+        os.remove(part_path)
+    else:
+        changed = [k for k, v in hashes.items() if (previous_hashes or {}).get(k) != v]
+        logging.info(f"{len(changed)} of {len(hashes)} modules changed content, writing {file_path}")
+        os.replace(part_path, file_path)
+    return hashes
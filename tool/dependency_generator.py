@@ -1,193 +1,163 @@
-import asyncio
-import os
-import json
-import logging
-from .utils import run_tasks, raise_error
-
-class DependencyGenerator:
-    def __init__(self, modules: dict[str, dict]):
-        self.modules = modules
-    
-    @staticmethod
-    def _find_avm_dependencies(schema: str) -> list[str]:
-        dependencies = []
-        try:            
-            module_prefix = 'module.avm-res-'.replace('-', '_')
-            if schema.find(module_prefix) == -1:
-                return dependencies
-            
-            current = 0
-            while current < len(schema):
-                start = schema.find(module_prefix, current)
-                if start == -1:
-                    break
-                
-                end = schema.find('.', start + len(module_prefix))
-                if end == -1:
-                    break
-                
-                module_name = schema[start + len('module.'):end]
-                if module_name:
-                    dependencies.append(module_name.replace('_', '-'))
-                
-                current = end + 1
-                
-        except Exception as e:
-            logging.error(f"Error finding AVM dependencies in schema: {e}")
-        
-        return list(set(dependencies))
-
-    def _generate_module_dependencies(self, module_name: str) -> dict:
-        try:       
-            result = {
-                "avm_depends_on": list(),
-                "required_depends_on": list(),
-                "required": dict(),
-                "optional": dict(),
-            }
-
-            for k, v in self.modules[module_name]['variables'].items():
-                if v['required']:
-                    result['required'][k] = DependencyGenerator._find_avm_dependencies(v['schema'])
-                else:
-                    result['optional'][k] = DependencyGenerator._find_avm_dependencies(v['schema'])
-
-            for rv in result['required']:
-                result['required'][rv] = list(set(result['required'][rv]))
-                result['required_depends_on'] += result['required'][rv]
-                result['avm_depends_on'] += result['required'][rv]
-
-            for ov in result['optional']:
-                result['optional'][ov] = list(set(result['optional'][ov]))
-                result['avm_depends_on'] += result['optional'][ov]
-
-            result['required_depends_on'] = list(set(result['required_depends_on']))
-            result['avm_depends_on'] = list(set(result['avm_depends_on']))
-                
-            return {module_name: result}
-                
-        except Exception as e:
-            raise_error(f"Error generating module dependencies: {e}")
-    
-    def _remove_exceptional_dependencies(self, module_name: str) -> dict:
-        dependencies = self.modules[module_name]['denpends_on']
-            
-        if module_name in dependencies["avm_depends_on"]:
-            dependencies["avm_depends_on"].remove(module_name)
-        if module_name in dependencies["required_depends_on"]:
-            dependencies["required_depends_on"].remove(module_name)
-        for rv in dependencies["required"]:
-            if module_name in dependencies["required"][rv]:
-                dependencies["required"][rv].remove(module_name)
-        for ov in dependencies["optional"]:
-            if module_name in dependencies["optional"][ov]:
-                dependencies["optional"][ov].remove(module_name)
-                
-        if module_name == "avm-res-resources-resourcegroup":
-            dependencies["avm_depends_on"] = []
-            dependencies["required_depends_on"] = []
-            for rv in dependencies["required"]:
-                dependencies["required"][rv] = []
-            for ov in dependencies["optional"]:
-                dependencies["optional"][ov] = []
-
-
-        return {module_name: dependencies}
-            
-
-    def _generate_dependency_priorities(self):
-        try:            
-            visited = set()
-            stack = set()
-            relations = {}
-
-            def visit(node: str):
-                if node in stack:
-                    raise_error(f"Cycle detected in AVM dependencies: {' -> '.join(stack)}")
-                if node in visited:
-                    return
-                
-                relations[node] = set()
-                visited.add(node)
-                stack.add(node)
-
-                for dep in self.modules.get(node, {}).get('denpends_on', {}).get("avm_depends_on", []):
-                    relations[node].add(dep)
-                    visit(dep)
-
-                stack.remove(node)
-
-            for module_name in self.modules:
-                visit(module_name)
-            
-            queue = list()
-            for k, v in relations.items():
-                if len(v) == 0:
-                    queue.append(k)
-            
-            priority = 0
-            while queue:
-                current = queue.pop(0)
-                if current not in self.modules:
-                    continue
-                
-                self.modules[current]['priority'] = priority
-                priority += 1
-                
-                for k in relations:
-                    if current in relations[k]:
-                        relations[k].remove(current)
-                        if len(relations[k]) == 0:
-                            queue.append(k)
-            
-            for _,v in relations.items():
-                if len(v) > 0:
-                    raise_error(f"Cycle detected in AVM dependencies: {v}")
-            
-            for module_name in self.modules:
-                if 'priority' not in self.modules[module_name]:
-                    raise_error(f"Module {module_name} does not have a priority assigned.")
-
-            logging.info("No cycles detected in AVM dependencies.")
-        except Exception as e:
-            raise_error(f"Error checking cycles in AVM dependencies: {e}")
-
-    async def generate(self):
-        tasks = []
-        for module_name in self.modules:
-            tasks.append(lambda x=module_name: self._generate_module_dependencies(x))
-        
-        results = await run_tasks(tasks, 10)
-        for result in results:
-            for k, v in result.items():
-                self.modules[k]['denpends_on'] = v
-
-        tasks = []
-        for module_name in self.modules:
-            tasks.append(lambda x=module_name: self._remove_exceptional_dependencies(x))
-        
-        results = await run_tasks(tasks, 10)
-        for result in results:
-            for k, v in result.items():
-                self.modules[k]['denpends_on'] = v
-        
-
-        self._generate_dependency_priorities()
-
-async def generate(modules: dict[str, dict]):
-    dependency_generator = DependencyGenerator(modules)
-    await dependency_generator.generate()
-
-async def main():
-    from utils import DEBUG_DATA_FILE_PATH
-    with open(DEBUG_DATA_FILE_PATH, 'r', encoding='utf-8') as f:
-        data = json.load(f)
-    
-    await generate(data)
-
-    with open(DEBUG_DATA_FILE_PATH, 'w', encoding='utf-8') as f:
-        f.write(json.dumps(data, indent=4))
-
-if __name__ == "__main__":
-    logging.basicConfig(level=logging.INFO)
+import asyncio
+import os
+import json
+import logging
+import re
+from .dependency_graph import DependencyGraph
+from .utils import raise_error
+
+# a reference to the output of another AVM module in a rendered schema, e.g. module.avm_res_keyvault_vault.resource_id
+_AVM_REFERENCE_PATTERN = re.compile(r'module\.(avm_res_[^.]*)\.')
+
+class DependencyGenerator:
+    def __init__(self, modules: dict[str, dict]):
+        self.modules = modules
+    
+    @staticmethod
+    def _find_avm_dependencies(schema: str) -> list[str]:
+        return sorted({name.replace('_', '-') for name in _AVM_REFERENCE_PATTERN.findall(schema)})
+
+    def _generate_module_dependencies(self, module_name: str) -> dict:
+        try:
+            result = {
+                "avm_depends_on": list(),
+                "required_depends_on": list(),
+                "required": dict(),
+                "optional": dict(),
+            }
+            avm_depends_on = set()
+            required_depends_on = set()
+
+            for k, v in self.modules[module_name]['variables'].items():
+                dependencies = DependencyGenerator._find_avm_dependencies(v['schema'])
+                avm_depends_on.update(dependencies)
+                if v['required']:
+                    result['required'][k] = dependencies
+                    required_depends_on.update(dependencies)
+                else:
+                    result['optional'][k] = dependencies
+
+            result['avm_depends_on'] = sorted(avm_depends_on)
+            result['required_depends_on'] = sorted(required_depends_on)
+
+            return {module_name: result}
+
+        except Exception as e:
+            raise_error(f"Error generating module dependencies: {e}")
+
+    def _remove_exceptional_dependencies(self, module_name: str) -> dict:
+        dependencies = self.modules[module_name]['denpends_on']
+            
+        if module_name in dependencies["avm_depends_on"]:
+            dependencies["avm_depends_on"].remove(module_name)
+        if module_name in dependencies["required_depends_on"]:
+            dependencies["required_depends_on"].remove(module_name)
+        for rv in dependencies["required"]:
+            if module_name in dependencies["required"][rv]:
+                dependencies["required"][rv].remove(module_name)
+        for ov in dependencies["optional"]:
+            if module_name in dependencies["optional"][ov]:
+                dependencies["optional"][ov].remove(module_name)
+                
+        if module_name == "avm-res-resources-resourcegroup":
+            dependencies["avm_depends_on"] = []
+            dependencies["required_depends_on"] = []
+            for rv in dependencies["required"]:
+                dependencies["required"][rv] = []
+            for ov in dependencies["optional"]:
+                dependencies["optional"][ov] = []
+
+
+        return {module_name: dependencies}
+            
+
+    def _generate_dependency_priorities(self, module_names = None, previous_data: dict[str, dict] = None):
+        try:
+            graph = DependencyGraph({k: self._known_dependencies(k, 'avm_depends_on') for k in self.modules})
+            previous_data = previous_data or {}
+            previous_priorities = {k: v['priority'] for k, v in previous_data.items() if 'priority' in v}
+            previous_layers = {k: v['layer'] for k, v in previous_data.items() if 'layer' in v}
+
+            if module_names is not None:
+                # a module whose dependency left the data keeps its schemas, yet no longer depends on that module
+                module_names = set(module_names) | {k for k in self.modules if k in previous_data and set(self._known_dependencies(k, 'avm_depends_on'))
+                                                    != set(previous_data[k].get('denpends_on', {}).get('avm_depends_on', []))}
+
+            if module_names is None or not previous_priorities:
+                # priorities follow the layers, and the module names within a layer, so they only change with the graph
+                priorities = {}
+                layers = {}
+                for layer, layer_modules in enumerate(graph.layers()):
+                    for module_name in layer_modules:
+                        priorities[module_name] = len(priorities)
+                        layers[module_name] = layer
+            else:
+                priorities, layers = graph.update_order(previous_priorities, previous_layers, module_names)
+
+            order = sorted(priorities, key=priorities.get)
+            for module_name in order:
+                self.modules[module_name]['priority'] = priorities[module_name]
+                self.modules[module_name]['layer'] = layers[module_name]
+
+            closures = graph.closures(order, {k: self._known_dependencies(k, 'required_depends_on') for k in self.modules})
+            for module_name, (required, every) in closures.items():
+                required_set = set(required)
+                self.modules[module_name]['closure'] = {
+                    "required": required,
+                    "optional": [k for k in every if k not in required_set],
+                    # the required closure in priority order, then the module itself
+                    "deployment_order": required + [module_name],
+                }
+
+            logging.info("No cycles detected in AVM dependencies.")
+        except Exception as e:
+            raise_error(f"Error checking cycles in AVM dependencies: {e}")
+
+    def _update_module_dependencies(self, module_name: str):
+        for k, v in self._generate_module_dependencies(module_name).items():
+            self.modules[k]['denpends_on'] = v
+        for k, v in self._remove_exceptional_dependencies(module_name).items():
+            self.modules[k]['denpends_on'] = v
+
+    def _known_dependencies(self, module_name: str, key: str) -> list[str]:
+        # a module left out of this run after a failure may still be referenced by the schemas of others
+        dependencies = self.modules[module_name]['denpends_on'][key]
+        for dependency in dependencies:
+            if dependency not in self.modules:
+                logging.warning(f"Ignoring the dependency of {module_name} on {dependency}, which is not in the data")
+        return [dependency for dependency in dependencies if dependency in self.modules]
+
+    async def generate(self, module_names = None, previous_data: dict[str, dict] = None):
+        """
+        Regenerate the dependencies of `module_names`, every module by default, then order all modules.
+        With the previous data of a partial refresh, only the part of the order that depends on `module_names` moves.
+        """
+        # scanning a schema takes microseconds, every module is updated before the errors are reported
+        errors = []
+        for module_name in (module_names if module_names is not None else self.modules):
+            try:
+                self._update_module_dependencies(module_name)
+            except Exception as e:
+                errors.append(f"{module_name}: {e}")
+        if errors:
+            raise_error("; ".join(errors))
+
+        self._generate_dependency_priorities(module_names, previous_data)
+
+async def generate(modules: dict[str, dict], module_names = None, previous_data: dict[str, dict] = None):
+    dependency_generator = DependencyGenerator(modules)
+    await dependency_generator.generate(module_names, previous_data)
+
+async def main():
+    from utils import DEBUG_DATA_FILE_PATH
+    with open(DEBUG_DATA_FILE_PATH, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    
+    await generate(data)
+
+    with open(DEBUG_DATA_FILE_PATH, 'w', encoding='utf-8') as f:
+        f.write(json.dumps(data, indent=4))
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
     asyncio.run(main())
\ No newline at end of file
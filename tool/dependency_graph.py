@@ -0,0 +1,143 @@
+from collections import deque
+
+from .utils import raise_error
+
+class DependencyGraph:
+    """
+    Modules and their direct AVM dependencies, with the reverse edges indexed so that ordering
+    the graph visits every module and every edge once.
+    """
+    def __init__(self, dependencies: dict[str, list[str]]):
+        self.dependencies: dict[str, list[str]] = {}
+        self.dependents: dict[str, list[str]] = {module_name: [] for module_name in dependencies}
+        for module_name, module_dependencies in dependencies.items():
+            self.dependencies[module_name] = sorted(set(module_dependencies))
+            for dependency in self.dependencies[module_name]:
+                if dependency not in self.dependents:
+                    raise_error(f"Module {module_name} depends on {dependency}, which is not an AVM module.")
+                self.dependents[dependency].append(module_name)
+
+    def find_cycle(self, module_names) -> list[str]:
+        """A dependency cycle among `module_names` as a path whose last module is its first, or [] if there is none."""
+        module_names = set(module_names)
+        state = {}  # 1 while on the current path, 2 once every dependency is explored
+        for root in sorted(module_names):
+            if root in state:
+                continue
+            path = [root]
+            iterators = [iter(self.dependencies[root])]
+            state[root] = 1
+            while iterators:
+                dependency = next(iterators[-1], None)
+                if dependency is None:
+                    state[path.pop()] = 2
+                    iterators.pop()
+                elif dependency not in module_names or state.get(dependency) == 2:
+                    continue
+                elif state.get(dependency) == 1:
+                    return path[path.index(dependency):] + [dependency]
+                else:
+                    state[dependency] = 1
+                    path.append(dependency)
+                    iterators.append(iter(self.dependencies[dependency]))
+        return []
+
+    def layers(self) -> list[list[str]]:
+        """
+        Kahn's algorithm: layer 0 holds the modules without dependencies and every other module sits one layer
+        above its deepest dependency, so the modules of a layer can be deployed in parallel. Modules are sorted by
+        name within a layer.
+        """
+        remaining = {module_name: len(dependencies) for module_name, dependencies in self.dependencies.items()}
+        layer_of = {}
+        queue = deque(sorted(module_name for module_name, count in remaining.items() if count == 0))
+        for module_name in queue:
+            layer_of[module_name] = 0
+
+        while queue:
+            current = queue.popleft()
+            for dependent in self.dependents[current]:
+                layer_of[dependent] = max(layer_of.get(dependent, 0), layer_of[current] + 1)
+                remaining[dependent] -= 1
+                if remaining[dependent] == 0:
+                    queue.append(dependent)
+
+        if len(layer_of) != len(self.dependencies):
+            cycle = self.find_cycle(module_name for module_name in self.dependencies if module_name not in layer_of)
+            raise_error(f"Cycle detected in AVM dependencies: {' -> '.join(cycle)}")
+
+        layers = [[] for _ in range(max(layer_of.values(), default=-1) + 1)]
+        for module_name in sorted(layer_of):
+            layers[layer_of[module_name]].append(module_name)
+        return layers
+
+    def update_order(self, previous_priorities: dict[str, int], previous_layers: dict[str, int], changed_modules) -> tuple[dict[str, int], dict[str, int]]:
+        """
+        Priorities and layers after the dependencies of `changed_modules` changed, from those of the previous graph.
+        Only the changed and new modules and their transitive dependents are re-leveled; each of them keeps its previous
+        priority while that still follows the priorities of its dependencies, and is otherwise numbered after every
+        existing priority. Priorities of all other modules do not change, at the cost of gaps left by moved modules.
+        """
+        affected = {module_name for module_name in self.dependencies
+                    if module_name in changed_modules or module_name not in previous_priorities or module_name not in previous_layers}
+        stack = list(affected)
+        while stack:
+            for dependent in self.dependents[stack.pop()]:
+                if dependent not in affected:
+                    affected.add(dependent)
+                    stack.append(dependent)
+
+        priorities = {k: previous_priorities[k] for k in self.dependencies if k not in affected}
+        layers = {k: previous_layers[k] for k in self.dependencies if k not in affected}
+        next_priority = max(previous_priorities.values(), default=-1) + 1
+
+        # Kahn's algorithm over the affected modules, the dependencies outside of them are already placed
+        remaining = {k: sum(1 for dependency in self.dependencies[k] if dependency in affected) for k in affected}
+        queue = deque(sorted(k for k, count in remaining.items() if count == 0))
+        while queue:
+            current = queue.popleft()
+            dependencies = self.dependencies[current]
+            layers[current] = max((layers[dependency] + 1 for dependency in dependencies), default=0)
+            lowest = max((priorities[dependency] for dependency in dependencies), default=-1)
+            if previous_priorities.get(current, -1) > lowest:
+                priorities[current] = previous_priorities[current]
+            else:
+                priorities[current] = next_priority
+                next_priority += 1
+
+            for dependent in self.dependents[current]:
+                remaining[dependent] -= 1
+                if remaining[dependent] == 0:
+                    queue.append(dependent)
+
+        if len(priorities) != len(self.dependencies):
+            cycle = self.find_cycle(k for k in affected if k not in priorities)
+            raise_error(f"Cycle detected in AVM dependencies: {' -> '.join(cycle)}")
+        return priorities, layers
+
+    def closures(self, order: list[str], required_dependencies: dict[str, list[str]]) -> dict[str, tuple[list[str], list[str]]]:
+        """
+        The transitive closure of every module over `required_dependencies` and over all its dependencies.
+        `order` is a topological order: each closure is a bitset over positions in `order`, built from the closures
+        of the direct dependencies, and decodes to a module list sorted in that order.
+        """
+        positions = {module_name: position for position, module_name in enumerate(order)}
+        every = {}
+        required = {}
+        for module_name in order:
+            every[module_name] = 0
+            for dependency in self.dependencies[module_name]:
+                every[module_name] |= (1 << positions[dependency]) | every[dependency]
+            required[module_name] = 0
+            for dependency in required_dependencies.get(module_name, []):
+                required[module_name] |= (1 << positions[dependency]) | required[dependency]
+
+        def decode(bitset: int) -> list[str]:
+            result = []
+            while bitset:
+                lowest = bitset & -bitset
+                result.append(order[lowest.bit_length() - 1])
+                bitset ^= lowest
+            return result
+
+        return {module_name: (decode(required[module_name]), decode(every[module_name])) for module_name in order}
@@ -0,0 +1,134 @@
+import hashlib
+import json
+import logging
+import os
+import shutil
+import uuid
+
+def sha256_file(file_path: str) -> str:
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(65536), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def load_json_cache(file_path: str, description: str) -> dict:
+    """The JSON object cached in `file_path`, empty when there is none or it cannot be read."""
+    if not file_path or not os.path.exists(file_path):
+        return {}
+    try:
+        with open(file_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except Exception as e:
+        logging.warning(f"Ignoring unreadable {description} {file_path}: {e}")
+        return {}
+
+def save_json_cache(file_path: str, content: dict):
+    """Write `content` to `file_path`, a falsy path disables the cache."""
+    if not file_path:
+        return
+    os.makedirs(os.path.dirname(file_path), exist_ok=True)
+    with open(file_path, 'w', encoding='utf-8') as f:
+        f.write(json.dumps(content))
+
+class FileCache:
+    """
+    Size-bounded directory of immutable entries addressed by a string key.
+
+    Every entry is stored next to a `.sha256` file and verified when it is read, corrupt entries are dropped.
+    Reading an entry refreshes its modification time, and `evict` removes the least recently used entries
+    until the directory is no larger than `max_size_bytes`.
+    """
+    def __init__(self, directory: str, max_size_bytes: int, suffix: str = ''):
+        self.directory = directory
+        self.max_size_bytes = max_size_bytes
+        self.suffix = suffix
+
+    def path(self, key: str) -> str:
+        digest = hashlib.sha256(key.encode('utf-8')).hexdigest()
+        return os.path.join(self.directory, digest[:2], f"{digest}{self.suffix}")
+
+    def get(self, key: str) -> str:
+        """Path of the verified entry for `key`, or None."""
+        path = self.path(key)
+        checksum_path = f"{path}.sha256"
+        if not os.path.exists(path) or not os.path.exists(checksum_path):
+            return None
+
+        with open(checksum_path, 'r', encoding='utf-8') as f:
+            expected = f.read().strip()
+        if sha256_file(path) != expected:
+            logging.warning(f"Dropping corrupt cache entry for {key}")
+            self._remove(path)
+            return None
+
+        os.utime(path)
+        return path
+
+    def checksum(self, key: str) -> str:
+        with open(f"{self.path(key)}.sha256", 'r', encoding='utf-8') as f:
+            return f.read().strip()
+
+    def put_file(self, key: str, source_path: str, sha256: str = None) -> str:
+        """Move `source_path` into the cache and return the path of the new entry."""
+        path = self.path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        sha256 = sha256 or sha256_file(source_path)
+        part_path = FileCache._part_path(path)
+        shutil.move(source_path, part_path)
+        os.replace(part_path, path)
+        checksum_part_path = FileCache._part_path(f"{path}.sha256")
+        with open(checksum_part_path, 'w', encoding='utf-8') as f:
+            f.write(sha256)
+        os.replace(checksum_part_path, f"{path}.sha256")
+        return path
+
+    def get_bytes(self, key: str) -> bytes:
+        path = self.get(key)
+        if path is None:
+            return None
+        with open(path, 'rb') as f:
+            return f.read()
+
+    def put_bytes(self, key: str, data: bytes):
+        path = self.path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        part_path = FileCache._part_path(path)
+        with open(part_path, 'wb') as f:
+            f.write(data)
+        self.put_file(key, part_path, hashlib.sha256(data).hexdigest())
+
+    def evict(self):
+        entries = []
+        total_size = 0
+        for root, _, files in os.walk(self.directory):
+            for file in files:
+                if file.endswith('.sha256') or file.endswith('.part'):
+                    continue
+                path = os.path.join(root, file)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+                total_size += stat.st_size
+
+        entries.sort()
+        for _, size, path in entries:
+            if total_size <= self.max_size_bytes:
+                break
+            self._remove(path)
+            total_size -= size
+
+    @staticmethod
+    def _part_path(path: str) -> str:
+        # unique per writer, concurrent writers of the same key must not share a temporary file
+        return f"{path}.{uuid.uuid4().hex}.part"
+
+    @staticmethod
+    def _remove(path: str):
+        for item in (path, f"{path}.sha256"):
+            try:
+                os.remove(item)
+            except FileNotFoundError:
+                pass
@@ -0,0 +1,160 @@
+import asyncio
+import logging
+import random
+import time
+
+import aiohttp
+
+from .file_cache import load_json_cache, save_json_cache
+from .http_client import HttpClient, HttpError, HttpResponse
+from .utils import GITHUB_ETAG_CACHE_FILE_PATH, GITHUB_MAX_RETRIES, HTTP_PER_HOST_CONCURRENCY, paused_timeout, raise_error
+
+class GitHubClient:
+    """
+    Request scheduler for the GitHub API.
+
+    - Answers are cached with their ETag / Last-Modified and revalidated with conditional requests,
+      a 304 does not count against the rate limit.
+    - `X-RateLimit-Remaining` shrinks the number of requests in flight as the budget runs out, and
+      an exhausted budget or a `Retry-After` pauses every request until the given time.
+    - Throttled, 5xx and failed requests are retried with exponential backoff and full jitter.
+    """
+    def __init__(self, http_client: HttpClient, headers: dict, cache_path: str = GITHUB_ETAG_CACHE_FILE_PATH,
+                 max_concurrency: int = HTTP_PER_HOST_CONCURRENCY, max_retries: int = GITHUB_MAX_RETRIES,
+                 backoff_base: float = 1.0, backoff_cap: float = 60.0):
+        self.http_client = http_client
+        self.headers = headers
+        self.cache_path = cache_path
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.cache: dict[str, dict] = load_json_cache(cache_path, 'ETag cache')
+        self.concurrency = max_concurrency
+        self._active = 0
+        self._slot = asyncio.Condition()
+        self._resume_at = 0.0
+
+    def save(self):
+        save_json_cache(self.cache_path, self.cache)
+
+    async def _acquire(self):
+        # waiting for the budget to recover is not held against the timeout of the task making the request
+        async with paused_timeout():
+            async with self._slot:
+                await self._slot.wait_for(lambda: self._active < self.concurrency)
+                self._active += 1
+            delay = self._resume_at - time.time()
+            if delay > 0:
+                logging.info(f"GitHub rate limit reached, waiting {delay:.0f}s")
+                await asyncio.sleep(delay)
+
+    async def _release(self):
+        async with self._slot:
+            self._active -= 1
+            self._slot.notify_all()
+
+    async def _observe(self, status: int, headers):
+        remaining = headers.get('X-RateLimit-Remaining')
+        if remaining is not None and remaining.isdigit():
+            remaining = int(remaining)
+            # keep roughly 50 requests of budget per request in flight
+            self.concurrency = max(1, min(self.max_concurrency, remaining // 50))
+            if remaining == 0 and headers.get('X-RateLimit-Reset', '').isdigit():
+                self._resume_at = max(self._resume_at, float(headers['X-RateLimit-Reset']))
+
+        retry_after = headers.get('Retry-After')
+        if retry_after is not None and retry_after.isdigit() and GitHubClient._is_throttled(status, headers):
+            self._resume_at = max(self._resume_at, time.time() + int(retry_after))
+
+        async with self._slot:
+            self._slot.notify_all()
+
+    @staticmethod
+    def _is_throttled(status: int, headers) -> bool:
+        return status == 429 or (status == 403 and (headers.get('X-RateLimit-Remaining') == '0' or 'Retry-After' in headers))
+
+    @staticmethod
+    def _should_retry(status: int, headers) -> bool:
+        return GitHubClient._is_throttled(status, headers) or status >= 500
+
+    def _backoff(self, attempt: int) -> float:
+        return random.uniform(0, min(self.backoff_cap, self.backoff_base * 2 ** attempt))
+
+    async def _send(self, url: str, request) -> HttpResponse:
+        for attempt in range(self.max_retries + 1):
+            response = None
+            await self._acquire()
+            try:
+                response = await request()
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                logging.warning(f"Request to {url} failed: {e}")
+            finally:
+                await self._release()
+
+            if response is not None:
+                await self._observe(response.status, response.headers)
+                if not GitHubClient._should_retry(response.status, response.headers):
+                    return response
+
+            if attempt < self.max_retries:
+                await asyncio.sleep(self._backoff(attempt))
+
+        if response is None:
+            raise_error(f"Request to {url} failed after {self.max_retries + 1} attempts")
+        return response
+
+    async def get(self, url: str) -> HttpResponse:
+        headers = dict(self.headers)
+        cached = self.cache.get(url)
+        if cached:
+            if cached.get('etag'):
+                headers['If-None-Match'] = cached['etag']
+            if cached.get('last_modified'):
+                headers['If-Modified-Since'] = cached['last_modified']
+
+        response = await self._send(url, lambda: self.http_client.get(url, headers))
+        if response.status == 304 and cached:
+            return HttpResponse(url, 200, response.headers, cached['body'].encode('utf-8'))
+        if response.status == 200:
+            self._store(url, response)
+        return response
+
+    async def get_json(self, url: str):
+        response = await self.get(url)
+        response.raise_for_status()
+        return response.json()
+
+    async def post_json(self, url: str, payload: dict):
+        response = await self._send(url, lambda: self.http_client.post(url, payload, self.headers))
+        response.raise_for_status()
+        return response.json()
+
+    async def download(self, url: str, dest_path: str) -> str:
+        for attempt in range(self.max_retries + 1):
+            await self._acquire()
+            try:
+                return await self.http_client.download(url, dest_path, headers=self.headers)
+            except HttpError as e:
+                await self._observe(e.status, e.headers)
+                if not GitHubClient._should_retry(e.status, e.headers) or attempt == self.max_retries:
+                    raise
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                if attempt == self.max_retries:
+                    raise
+                logging.warning(f"Download of {url} failed: {e}")
+            finally:
+                await self._release()
+
+            await asyncio.sleep(self._backoff(attempt))
+
+    def _store(self, url: str, response: HttpResponse):
+        etag = response.headers.get('ETag')
+        last_modified = response.headers.get('Last-Modified')
+        if not etag and not last_modified:
+            return
+        self.cache[url] = {
+            'etag': etag,
+            'last_modified': last_modified,
+            'body': response.text,
+        }
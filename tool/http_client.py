@@ -0,0 +1,108 @@
+import asyncio
+import hashlib
+import json
+import os
+from urllib.parse import urlsplit
+
+import aiohttp
+from multidict import CIMultiDict
+
+from .utils import HTTP_PER_HOST_CONCURRENCY
+
+class HttpError(Exception):
+    def __init__(self, url: str, status: int, headers: dict):
+        super().__init__(f"HTTP {status} for {url}")
+        self.url = url
+        self.status = status
+        self.headers = headers
+
+class HttpResponse:
+    def __init__(self, url: str, status: int, headers: dict, body: bytes):
+        self.url = url
+        self.status = status
+        self.headers = headers
+        self.body = body
+
+    @property
+    def text(self) -> str:
+        return self.body.decode('utf-8')
+
+    def json(self):
+        return json.loads(self.body)
+
+    def raise_for_status(self):
+        if self.status >= 400:
+            raise HttpError(self.url, self.status, self.headers)
+
+class HttpClient:
+    """
+    Native asyncio HTTP client shared by the loader. All requests go through one keep-alive
+    connection pool, and at most `per_host_concurrency` requests run against the same host.
+    """
+    def __init__(self, per_host_concurrency: int = HTTP_PER_HOST_CONCURRENCY, total_connections: int = 100):
+        self.per_host_concurrency = per_host_concurrency
+        self.total_connections = total_connections
+        self._semaphores: dict[str, asyncio.Semaphore] = {}
+        self._session: aiohttp.ClientSession = None
+
+    async def __aenter__(self) -> 'HttpClient':
+        connector = aiohttp.TCPConnector(
+            limit=self.total_connections,
+            limit_per_host=self.per_host_concurrency,
+            keepalive_timeout=60,
+            ttl_dns_cache=300,
+        )
+        timeout = aiohttp.ClientTimeout(total=None, sock_connect=30, sock_read=120)
+        self._session = aiohttp.ClientSession(connector=connector, timeout=timeout, raise_for_status=False)
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self._session.close()
+        self._session = None
+
+    def _semaphore(self, url: str) -> asyncio.Semaphore:
+        host = urlsplit(url).hostname or ''
+        if host not in self._semaphores:
+            self._semaphores[host] = asyncio.Semaphore(self.per_host_concurrency)
+        return self._semaphores[host]
+
+    async def get(self, url: str, headers: dict = None) -> HttpResponse:
+        async with self._semaphore(url):
+            async with self._session.get(url, headers=headers) as response:
+                body = await response.read()
+                return HttpResponse(url, response.status, CIMultiDict(response.headers), body)
+
+    async def post(self, url: str, payload: dict, headers: dict = None) -> HttpResponse:
+        async with self._semaphore(url):
+            async with self._session.post(url, json=payload, headers=headers) as response:
+                body = await response.read()
+                return HttpResponse(url, response.status, CIMultiDict(response.headers), body)
+
+    async def get_json(self, url: str, headers: dict = None):
+        response = await self.get(url, headers)
+        response.raise_for_status()
+        return response.json()
+
+    async def get_text(self, url: str, headers: dict = None) -> str:
+        response = await self.get(url, headers)
+        response.raise_for_status()
+        return response.text
+
+    async def download(self, url: str, dest_path: str, headers: dict = None, chunk_size: int = 65536) -> str:
+        """Stream the body of `url` into `dest_path` and return its SHA-256."""
+        digest = hashlib.sha256()
+        part_path = f"{dest_path}.part"
+        try:
+            async with self._semaphore(url):
+                async with self._session.get(url, headers=headers) as response:
+                    if response.status >= 400:
+                        raise HttpError(url, response.status, CIMultiDict(response.headers))
+                    with open(part_path, 'wb') as file:
+                        async for chunk in response.content.iter_chunked(chunk_size):
+                            file.write(chunk)
+                            digest.update(chunk)
+            os.replace(part_path, dest_path)
+        finally:
+            if os.path.exists(part_path):
+                os.remove(part_path)
+        return digest.hexdigest()
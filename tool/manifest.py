@@ -0,0 +1,138 @@
+import json
+import os
+import logging
+
+from .file_cache import sha256_file
+from .utils import AZURERM_TO_AVM_FILE_PATH, DATA_FORMAT_VERSION
+
+def hash_module_inputs(module_directory: str) -> dict[str, str]:
+    """Hash the files the parsers read: variable*.tf, outputs.tf and examples/*/main.tf."""
+    result = {}
+    if not os.path.isdir(module_directory):
+        return result
+
+    for entry in os.listdir(module_directory):
+        file_path = os.path.join(module_directory, entry)
+        if not os.path.isfile(file_path):
+            continue
+        if (entry.startswith('variable') and entry.endswith('.tf')) or entry == 'outputs.tf':
+            result[entry] = sha256_file(file_path)
+
+    example_directory = os.path.join(module_directory, 'examples')
+    if os.path.isdir(example_directory):
+        for entry in os.listdir(example_directory):
+            file_path = os.path.join(example_directory, entry, 'main.tf')
+            if os.path.isfile(file_path):
+                result[f'examples/{entry}/main.tf'] = sha256_file(file_path)
+
+    return dict(sorted(result.items()))
+
+class Manifest:
+    """
+    Persisted record of what every module was built from: release tag, tarball SHA-256, the
+    hashes of the parser input files and the modules its examples refer to, and the hash of the module as last written.
+    The hash of `azurerm_to_avm.json`, which every example renders through, is recorded for the whole run. It drives the incremental refresh in `python -m tool --incremental`.
+    """
+    def __init__(self, modules: dict[str, dict] = None):
+        self.modules: dict[str, dict] = modules or {}
+        # modules whose outputs/variables/dependencies must be regenerated in this run
+        self.changed_modules: set[str] = set()
+
+    @staticmethod
+    def load(file_path: str) -> 'Manifest':
+        if not os.path.exists(file_path):
+            return Manifest()
+        try:
+            with open(file_path, 'r', encoding='utf-8') as f:
+                content = json.load(f)
+            if content.get('version') != DATA_FORMAT_VERSION:
+                logging.info(f"Manifest {file_path} was written for data format {content.get('version')}, not {DATA_FORMAT_VERSION}, rebuilding every module")
+                return Manifest()
+            if content.get('azurerm_to_avm_sha256') != sha256_file(AZURERM_TO_AVM_FILE_PATH):
+                logging.info(f"{AZURERM_TO_AVM_FILE_PATH} changed since manifest {file_path} was written, rebuilding every module")
+                return Manifest()
+            return Manifest(content.get('modules', {}))
+        except Exception as e:
+            logging.warning(f"Ignoring unreadable manifest {file_path}: {e}")
+            return Manifest()
+
+    def save(self, file_path: str):
+        with open(file_path, 'w', encoding='utf-8') as f:
+            f.write(json.dumps({
+                'version': DATA_FORMAT_VERSION,
+                'azurerm_to_avm_sha256': sha256_file(AZURERM_TO_AVM_FILE_PATH),
+                'modules': dict(sorted(self.modules.items())),
+            }, indent=4))
+
+    def forget(self, module_name: str):
+        """Drop what is known about a module, the next incremental run retrieves it again."""
+        self.modules.pop(module_name, None)
+
+    def retain(self, module_names):
+        self.modules = {k: v for k, v in self.modules.items() if k in module_names}
+
+    def stale_modules(self, releases: dict[str, dict], previous_data: dict[str, dict]) -> set[str]:
+        """
+        Modules that must be downloaded: new releases, modules missing from the previous data, and the modules
+        whose examples refer to one of them or to a module that was removed.
+        """
+        stale = set()
+        for module_name, release in releases.items():
+            entry = self.modules.get(module_name)
+            if module_name not in previous_data or entry is None or entry.get('tag_name') != release.get('tag_name'):
+                stale.add(module_name)
+
+        removed = {k for k in previous_data if k not in releases}
+        return stale | self._dependents(stale | removed, releases.keys())
+
+    def record_release(self, module_name: str, release: dict, tarball_sha256: str):
+        entry = self.modules.setdefault(module_name, {})
+        entry['tag_name'] = release.get('tag_name')
+        entry['tarball_sha256'] = tarball_sha256
+
+    def record_inputs(self, module_name: str, input_hashes: dict[str, str]) -> bool:
+        """Store the input hashes of a module and return whether they differ from the previous run."""
+        entry = self.modules.setdefault(module_name, {})
+        changed = entry.get('inputs') != input_hashes
+        entry['inputs'] = input_hashes
+        return changed
+
+    def record_references(self, module_name: str, referenced_modules):
+        """Store the modules the examples of a module refer to, its schemas render their outputs."""
+        self.modules.setdefault(module_name, {})['references'] = sorted(referenced_modules)
+
+    def content_hashes(self) -> dict[str, str]:
+        return {k: v['content_sha256'] for k, v in self.modules.items() if 'content_sha256' in v}
+
+    def record_content(self, content_hashes: dict[str, str]):
+        for module_name, content_sha256 in content_hashes.items():
+            self.modules.setdefault(module_name, {})['content_sha256'] = content_sha256
+
+    def plan_changes(self, inputs_changed: set[str], downloaded: set[str], previous_data: dict[str, dict], module_names):
+        """
+        Modules with changed inputs are re-parsed together with the downloaded modules whose examples refer to them
+        or to a module of the previous data that is no longer among `module_names`.
+        """
+        changed = {k for k in inputs_changed if k in downloaded} | {k for k in downloaded if k not in previous_data}
+        removed = {k for k in previous_data if k not in module_names}
+        self.changed_modules = changed | (self._dependents(changed | removed, downloaded) & downloaded)
+
+    def _dependents(self, module_names: set[str], candidates) -> set[str]:
+        # a module's schemas render the outputs of the modules its examples refer to, whether or not one matched
+        # last time, so they are refreshed too
+        result = set()
+        for candidate in candidates:
+            references = self.modules.get(candidate, {}).get('references', [])
+            if any(item in module_names for item in references):
+                result.add(candidate)
+        return result
+
+def load_previous_data(file_path: str) -> dict[str, dict]:
+    if not os.path.exists(file_path):
+        return {}
+    try:
+        with open(file_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except Exception as e:
+        logging.warning(f"Ignoring unreadable previous data {file_path}: {e}")
+        return {}
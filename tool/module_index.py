@@ -0,0 +1,38 @@
+import hashlib
+import json
+import os
+
+from .data_writer import encode_module
+from .utils import DATA_FORMAT_VERSION
+
+# module fields copied into the index, so a consumer can list and rank modules without reading any of them
+INDEX_FIELDS = ('display_name', 'source', 'description', 'priority', 'layer')
+
+def write_module_index(data: dict[str, dict], modules_file_path: str, index_file_path: str):
+    """
+    Write every module as one compact JSON line of `modules_file_path`, in module name order, and, in `index_file_path`,
+    the metadata of every module with the byte offset, size and SHA-256 of its line.
+    """
+    modules = {}
+    offset = 0
+    with open(modules_file_path, 'wb') as f:
+        for module_name in sorted(data):
+            module = data[module_name]
+            line = encode_module(module)
+            f.write(line)
+            f.write(b'\n')
+
+            entry = {field: module[field] for field in INDEX_FIELDS if field in module}
+            entry['offset'] = offset
+            entry['size'] = len(line)
+            entry['sha256'] = hashlib.sha256(line).hexdigest()
+            modules[module_name] = entry
+            offset += len(line) + 1
+
+    index = {
+        'version': DATA_FORMAT_VERSION,
+        'modules_file': os.path.basename(modules_file_path),
+        'modules': modules,
+    }
+    with open(index_file_path, 'w', encoding='utf-8') as f:
+        f.write(json.dumps(index, indent=4))
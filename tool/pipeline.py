@@ -0,0 +1,194 @@
+import asyncio
+import contextlib
+import functools
+import json
+import logging
+import os
+
+from .data_loader import finish_loading, load_modules_info, retrieval_runner, retrieve_module, reuse_previous_data
+from .data_parser import hcl_pool
+from .data_parser.output_parser import parse as parse_module_outputs
+from .data_parser.type_parser import type_cache_info
+from .data_parser.variable_parser import VariableParser
+from .manifest import Manifest
+from .sources import GitHubSource, SourceProvider
+from .utils import DEBUG_DATA_FILE_PATH, HCL_PARSER_WORKERS, PIPELINE_QUEUE_SIZE, TASK_TIMEOUT, TaskRunner, raise_error
+
+def _first_error(e: BaseException) -> BaseException:
+    while isinstance(e, BaseExceptionGroup):
+        e = e.exceptions[0]
+    return e
+
+class ModulePipeline:
+    """
+    Moves every module through retrieve -> parse outputs -> parse examples and variables on its own, so parsing starts
+    with the first download instead of the last one. Stages hand modules over through bounded queues: a stage that falls
+    behind holds back the stage in front of it. The variables of a module are parsed as soon as the outputs of the
+    modules its examples refer to are known. A module that fails in any stage is recorded in `failed_modules`
+    and leaves the pipeline, the other modules carry on. A module whose examples refer to a failed module fails too,
+    it would otherwise be built from outputs that do not match the data kept for that module.
+    """
+    def __init__(self, data: dict[str, dict], source: SourceProvider, releases: dict[str, dict], manifest: Manifest):
+        self.data = data
+        self.source = source
+        self.releases = releases
+        self.manifest = manifest
+        self.variable_parser = VariableParser(data)
+        self.workers = max(HCL_PARSER_WORKERS, 1) * 2
+        # shared by both parse stages, parsing is deterministic so a failure is not retried
+        self.parse_runner = TaskRunner(self.workers, timeout=TASK_TIMEOUT, adaptive=True)
+        # modules whose parser inputs differ from the previous run
+        self.inputs_changed: set[str] = set()
+        self.failed_modules: dict[str, BaseException] = {}
+        self.retrieved = asyncio.Queue(PIPELINE_QUEUE_SIZE)
+        self.outputs_parsed = asyncio.Queue(PIPELINE_QUEUE_SIZE)
+        self.outputs_ready: dict[str, asyncio.Event] = {}
+        self.referenced_modules: dict[str, set[str]] = {}
+
+    def _fail(self, module_name: str, error: BaseException):
+        logging.error(f"Module {module_name} failed: {error}")
+        self.failed_modules[module_name] = error
+        # modules waiting for its outputs fail in turn
+        self.outputs_ready[module_name].set()
+
+    async def _retrieve(self, module_names: list[str]):
+        tasks = []
+        for module_name in module_names:
+            tasks.append(functools.partial(retrieve_module, self.source, self.data[module_name], self.releases[module_name], self.manifest))
+
+        # the runner only starts new retrievals while this loop is not blocked on a full queue
+        async with contextlib.aclosing(retrieval_runner().as_completed(tasks)) as outcomes:
+            async for outcome in outcomes:
+                module_name = module_names[outcome.index]
+                if outcome.error is not None:
+                    self._fail(module_name, outcome.error)
+                    continue
+                if outcome.result:
+                    self.inputs_changed.add(module_name)
+                await self.retrieved.put(module_name)
+
+    async def _parse_outputs(self):
+        while True:
+            module_name = await self.retrieved.get()
+            if module_name is None:
+                return
+            outcome = await self.parse_runner.call(functools.partial(parse_module_outputs, self.data[module_name]))
+            if outcome.error is not None:
+                self._fail(module_name, outcome.error)
+                continue
+            self.data[module_name]['outputs'] = outcome.result[module_name]
+            self.outputs_ready[module_name].set()
+            await self.outputs_parsed.put(module_name)
+
+    async def _wait_for_inputs(self, module_name: str) -> list[str]:
+        """Wait for the outputs of the modules the examples refer to and return the ones that failed."""
+        self.referenced_modules[module_name] = await self.variable_parser.referenced_modules(module_name)
+        self.manifest.record_references(module_name, self.referenced_modules[module_name])
+        # the outputs of modules outside the pipeline are already known
+        for referenced_module in self.referenced_modules[module_name]:
+            if referenced_module in self.outputs_ready:
+                await self.outputs_ready[referenced_module].wait()
+        return self._failed_inputs(module_name)
+
+    def _failed_inputs(self, module_name: str) -> list[str]:
+        return sorted(k for k in self.referenced_modules.get(module_name, ()) if k in self.failed_modules)
+
+    def _fail_dependents(self):
+        """Fail the modules that refer to a module which failed after their variables were parsed."""
+        while True:
+            dependents = [k for k in self.referenced_modules if k not in self.failed_modules and self._failed_inputs(k)]
+            if not dependents:
+                return
+            for module_name in dependents:
+                self._fail(module_name, Exception(f"Depends on failed modules: {', '.join(self._failed_inputs(module_name))}"))
+
+    async def _parse_variables(self):
+        async def parse(module_name: str):
+            try:
+                failed_inputs = await self._wait_for_inputs(module_name)
+            except Exception as e:
+                self._fail(module_name, e)
+                return
+            if failed_inputs:
+                self._fail(module_name, Exception(f"Depends on failed modules: {', '.join(failed_inputs)}"))
+                return
+            outcome = await self.parse_runner.call(functools.partial(self.variable_parser.parse, module_name))
+            if outcome.error is not None:
+                self._fail(module_name, outcome.error)
+                return
+            self.data[module_name]['variables'] = outcome.result[module_name]
+
+        # modules waiting for their inputs are parked as tasks, so they never block the queue
+        async with asyncio.TaskGroup() as group:
+            while True:
+                module_name = await self.outputs_parsed.get()
+                if module_name is None:
+                    return
+                group.create_task(parse(module_name))
+
+    async def run(self, module_names):
+        module_names = list(module_names)
+        self.outputs_ready = {module_name: asyncio.Event() for module_name in module_names}
+        async with asyncio.TaskGroup() as group:
+            variables_stage = group.create_task(self._parse_variables())
+            outputs_stage = [group.create_task(self._parse_outputs()) for _ in range(self.workers)]
+
+            await self._retrieve(module_names)
+            for _ in outputs_stage:
+                await self.retrieved.put(None)
+            await asyncio.gather(*outputs_stage)
+            await self.outputs_parsed.put(None)
+            await variables_stage
+        self._fail_dependents()
+
+        cache_info = type_cache_info()
+        logging.info(f"Variable types: {cache_info.misses} distinct, {cache_info.hits} reused")
+        if self.failed_modules:
+            logging.error(f"{len(self.failed_modules)} of {len(module_names)} modules failed: {', '.join(sorted(self.failed_modules))}")
+
+async def build_data(manifest: Manifest = None, previous_data: dict[str, dict] = None, source: SourceProvider = None) -> dict[str, dict]:
+    """
+    Load the module index and build the modules from `source`, GitHub by default: every module retrieved is parsed
+    while the other modules are still downloading. With a manifest and the previous data, only modules whose release
+    changed go through the pipeline and `manifest.changed_modules` lists the ones that changed.
+    """
+    manifest = manifest if manifest is not None else Manifest()
+    previous_data = previous_data or {}
+
+    source = source if source is not None else GitHubSource()
+
+    async with source:
+        try:
+            data = await load_modules_info(source)
+        except Exception as e:
+            raise_error(f"Failed to load modules info: {e}")
+
+        try:
+            releases = await source.latest_releases(data)
+            stale_modules = manifest.stale_modules(releases, previous_data)
+        except Exception as e:
+            raise_error(f"Failed to retrieve the latest version: {e}")
+
+        os.environ['PYTHONUTF8'] = '1'  # Enable UTF-8 mode
+
+        # the modules that are not retrieved again are complete before the pipeline starts
+        reuse_previous_data(data, previous_data, [k for k in data if k not in stale_modules])
+        pipeline = ModulePipeline(data, source, releases, manifest)
+        try:
+            await pipeline.run([k for k in data if k in stale_modules])
+        except Exception as e:
+            raise_error(f"Failed to build the module data: {_first_error(e)}")
+        finally:
+            hcl_pool.shutdown()
+
+    finish_loading(data, manifest, previous_data, stale_modules, pipeline.inputs_changed, pipeline.failed_modules)
+    return data
+
+async def main():
+    data = await build_data()
+    with open(DEBUG_DATA_FILE_PATH, 'w', encoding='utf-8') as f:
+        f.write(json.dumps(data, indent=4))
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(main())
@@ -0,0 +1,113 @@
+import json
+import mmap
+import os
+
+from .text_table import SHARED_TEXT_FIELDS, load_text_table, resolve_text
+from .type_table import load_type_table, resolve_type
+from .utils import MODULE_INDEX_FILE_PATH, ORIGIN_DATA_FILE_PATH, TEXT_TABLE_FILE_PATH, TYPE_TABLE_FILE_PATH
+
+def _is_reference(value) -> bool:
+    return isinstance(value, dict) and '$ref' in value
+
+class AvmDataReader:
+    """
+    Read access to the published data, written inline or with the `--text-table` / `--type-table` side tables.
+    References are resolved per variable on first access, and a side table is only loaded once a variable refers to it.
+    """
+    def __init__(self, data_file_path: str = ORIGIN_DATA_FILE_PATH,
+                 text_table_file_path: str = TEXT_TABLE_FILE_PATH,
+                 type_table_file_path: str = TYPE_TABLE_FILE_PATH):
+        self._modules: dict[str, dict] = {}
+        if data_file_path is not None:
+            with open(data_file_path, 'r', encoding='utf-8') as f:
+                self._modules = json.load(f)
+        self._text_table_file_path = text_table_file_path
+        self._type_table_file_path = type_table_file_path
+        self._text_table: dict[str, str] = None
+        self._type_table: dict[str, dict] = None
+        self._resolved: set[tuple[str, str]] = set()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def close(self):
+        pass
+
+    def _texts(self) -> dict[str, str]:
+        if self._text_table is None:
+            self._text_table = load_text_table(self._text_table_file_path)
+        return self._text_table
+
+    def _types(self) -> dict[str, dict]:
+        if self._type_table is None:
+            self._type_table = load_type_table(self._type_table_file_path)
+        return self._type_table
+
+    def _module(self, module_name: str) -> dict:
+        return self._modules[module_name]
+
+    def module_names(self) -> list[str]:
+        return list(self._modules.keys())
+
+    def module(self, module_name: str) -> dict:
+        """The module with the references of all its variables resolved."""
+        module = self._module(module_name)
+        for variable_name in module.get('variables', {}):
+            self.variable(module_name, variable_name)
+        return module
+
+    def variable(self, module_name: str, variable_name: str) -> dict:
+        variable = self._module(module_name)['variables'][variable_name]
+        if (module_name, variable_name) in self._resolved:
+            return variable
+
+        for field in SHARED_TEXT_FIELDS:
+            if _is_reference(variable.get(field)):
+                variable[field] = resolve_text(variable[field], self._texts())
+        if _is_reference(variable.get('type')):
+            variable['type'] = resolve_type(variable['type'], self._types())
+        self._resolved.add((module_name, variable_name))
+        return variable
+
+    def schema(self, module_name: str, variable_name: str) -> str:
+        return self.variable(module_name, variable_name)['schema']
+
+class IndexedAvmDataReader(AvmDataReader):
+    """
+    Reader of the `--module-index` layout: the modules file is memory-mapped and a module is decoded
+    from its byte range the first time it is requested, the index alone answers metadata queries.
+    """
+    def __init__(self, index_file_path: str = MODULE_INDEX_FILE_PATH,
+                 text_table_file_path: str = TEXT_TABLE_FILE_PATH,
+                 type_table_file_path: str = TYPE_TABLE_FILE_PATH):
+        super().__init__(None, text_table_file_path, type_table_file_path)
+        with open(index_file_path, 'r', encoding='utf-8') as f:
+            self.index: dict = json.load(f)
+
+        self._mmap: mmap.mmap = None
+        modules_file_path = os.path.join(os.path.dirname(index_file_path), self.index['modules_file'])
+        with open(modules_file_path, 'rb') as f:
+            if os.fstat(f.fileno()).st_size > 0:
+                self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def close(self):
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+
+    def _module(self, module_name: str) -> dict:
+        module = self._modules.get(module_name)
+        if module is None:
+            entry = self.index['modules'][module_name]
+            module = json.loads(self._mmap[entry['offset']:entry['offset'] + entry['size']])
+            self._modules[module_name] = module
+        return module
+
+    def module_names(self) -> list[str]:
+        return list(self.index['modules'].keys())
+
+    def metadata(self, module_name: str) -> dict:
+        return self.index['modules'][module_name]
@@ -0,0 +1,120 @@
+import json
+import logging
+import time
+from urllib.parse import quote
+
+from .file_cache import load_json_cache, save_json_cache
+from .github_client import GitHubClient
+from .utils import GITHUB_API_URL, GITHUB_GRAPHQL_URL, RELEASE_CACHE_FILE_PATH, RELEASE_CACHE_TTL, TASK_TIMEOUT, TaskRunner, github_repository
+
+GRAPHQL_BATCH_SIZE = 50
+
+_REPOSITORY_FIELDS = '''
+    latestRelease { tagName tagCommit { oid } }
+    releases(first: 1, orderBy: {field: CREATED_AT, direction: DESC}) { nodes { tagName tagCommit { oid } } }
+    refs(refPrefix: "refs/tags/", first: 1, orderBy: {field: TAG_COMMIT_DATE, direction: DESC}) {
+      nodes { name target { oid ... on Tag { target { oid } } } }
+    }'''
+
+def _build_query(repositories: list[tuple[str, str, str]]) -> str:
+    parts = []
+    for alias, owner, name in repositories:
+        parts.append(f'  {alias}: repository(owner: {json.dumps(owner)}, name: {json.dumps(name)}) {{{_REPOSITORY_FIELDS}\n  }}')
+    return 'query {\n' + '\n'.join(parts) + '\n}'
+
+def _release_from_repository(owner: str, name: str, repository: dict) -> dict:
+    """Latest release, falling back to the newest release and then to the newest tag, like the REST lookup."""
+    if not repository:
+        return None
+
+    tag_name, commit_sha = None, None
+    latest_release = repository.get('latestRelease')
+    releases = (repository.get('releases') or {}).get('nodes') or []
+    tags = (repository.get('refs') or {}).get('nodes') or []
+    if latest_release:
+        tag_name, commit_sha = latest_release['tagName'], (latest_release.get('tagCommit') or {}).get('oid')
+    elif releases:
+        tag_name, commit_sha = releases[0]['tagName'], (releases[0].get('tagCommit') or {}).get('oid')
+    elif tags:
+        target = tags[0].get('target') or {}
+        tag_name, commit_sha = tags[0]['name'], (target.get('target') or {}).get('oid') or target.get('oid')
+
+    if tag_name is None:
+        return None
+
+    return {
+        'tag_name': tag_name,
+        'commit_sha': commit_sha,
+        'tarball_url': f"{GITHUB_API_URL}/repos/{owner}/{name}/tarball/{quote(tag_name, safe='')}",
+    }
+
+class ReleaseDiscovery:
+    """
+    Resolves the latest release of many repositories with a few aliased GraphQL queries
+    (GRAPHQL_BATCH_SIZE repositories per query) instead of up to three REST calls per repository.
+    Results are cached for `cache_ttl` seconds so retries of a run do not query again.
+    """
+    def __init__(self, github: GitHubClient, endpoint: str = GITHUB_GRAPHQL_URL,
+                 cache_path: str = RELEASE_CACHE_FILE_PATH, cache_ttl: int = RELEASE_CACHE_TTL):
+        self.github = github
+        self.endpoint = endpoint
+        self.cache_path = cache_path
+        self.cache_ttl = cache_ttl
+        self.cache: dict[str, dict] = load_json_cache(cache_path, 'release cache')
+
+    def save(self):
+        save_json_cache(self.cache_path, self.cache)
+
+    def _cached(self, repo_url: str) -> dict:
+        entry = self.cache.get(repo_url)
+        if entry and time.time() - entry.get('resolved_at', 0) < self.cache_ttl:
+            return entry['release']
+        return None
+
+    async def _query(self, batch: list[tuple[str, dict]]) -> dict[str, dict]:
+        repositories = []
+        for index, (module_name, module) in enumerate(batch):
+            owner, name = github_repository(module['git_hub_url'])
+            repositories.append((f'r{index}', owner, name))
+
+        try:
+            response = await self.github.post_json(self.endpoint, {'query': _build_query(repositories)})
+        except Exception as e:
+            logging.warning(f"GraphQL release discovery failed: {e}")
+            return {}
+
+        data = response.get('data') or {}
+        for error in response.get('errors') or []:
+            logging.warning(f"GraphQL release discovery: {error.get('message', error)}")
+
+        result = {}
+        for (module_name, module), (alias, owner, name) in zip(batch, repositories):
+            release = _release_from_repository(owner, name, data.get(alias))
+            if release is not None:
+                result[module_name] = release
+                self.cache[module['git_hub_url']] = {'resolved_at': time.time(), 'release': release}
+        return result
+
+    async def discover(self, modules_info: dict[str, dict]) -> dict[str, dict]:
+        """Return the releases that could be resolved; callers fall back to REST for the missing modules."""
+        result = {}
+        pending = []
+        for module_name, module in modules_info.items():
+            cached = self._cached(module['git_hub_url'])
+            if cached is not None:
+                result[module_name] = cached
+            else:
+                pending.append((module_name, module))
+
+        tasks = []
+        for start in range(0, len(pending), GRAPHQL_BATCH_SIZE):
+            tasks.append(self._query(pending[start:start + GRAPHQL_BATCH_SIZE]))
+        for outcome in await TaskRunner(timeout=TASK_TIMEOUT).run(tasks):
+            if outcome.error is not None:
+                logging.warning(f"GraphQL release discovery failed: {outcome.error}")
+                continue
+            result.update(outcome.result)
+
+        self.save()
+        logging.info(f"Resolved {len(result)} of {len(modules_info)} releases with GraphQL ({len(modules_info) - len(pending)} cached).")
+        return result
@@ -0,0 +1,238 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tarfile
+from abc import ABC, abstractmethod
+
+from .file_cache import FileCache, sha256_file
+from .github_client import GitHubClient
+from .http_client import HttpClient
+from .manifest import hash_module_inputs
+from .release_discovery import ReleaseDiscovery
+from .utils import AVAILABLE_MODULES_URL, DOWNLOADED_TAR_PATH, GITHUB_API_URL, TARBALL_CACHE_MAX_SIZE, TARBALL_CACHE_PATH, TASK_TIMEOUT, TaskRunner, github_repository, raise_error
+
+def _is_parser_input(parts: list[str]) -> bool:
+    """Whether a path relative to the module root is one of variable*.tf, outputs.tf or examples/*/main.tf."""
+    if any(part in ('', '.', '..') for part in parts):
+        return False
+    if len(parts) == 1 and ((parts[0].startswith('variable') and parts[0].endswith('.tf')) or parts[0] == 'outputs.tf'):
+        return True
+    return len(parts) == 3 and parts[0] == 'examples' and parts[2] == 'main.tf'
+
+def _reset_directory(directory: str):
+    if os.path.exists(directory):
+        shutil.rmtree(directory)
+    os.makedirs(directory, exist_ok=True)
+
+def extract_module(tar_path: str, extract_to: str):
+    """Stream the archive once and only write the files the parsers read, without the top-level directory."""
+    _reset_directory(extract_to)
+    with tarfile.open(tar_path, "r|gz") as tar:
+        for member in tar:
+            if not member.isfile():
+                continue
+            parts = member.name.split('/')[1:]  # strip the single top-level directory of the archive
+            if not _is_parser_input(parts):
+                continue
+
+            dest_path = os.path.join(extract_to, *parts)
+            os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+            with tar.extractfile(member) as src, open(dest_path, 'wb') as dst:
+                shutil.copyfileobj(src, dst)
+
+def copy_module(module_directory: str, extract_to: str):
+    """Copy the files the parsers read from a checked-out repository."""
+    _reset_directory(extract_to)
+    for relative_path in hash_module_inputs(module_directory):
+        dest_path = os.path.join(extract_to, *relative_path.split('/'))
+        os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+        shutil.copyfile(os.path.join(module_directory, *relative_path.split('/')), dest_path)
+
+class SourceProvider(ABC):
+    """
+    Where the module index, the latest releases and the module files come from.
+    Providers are async context managers, `build_data` enters one for the whole loading stage.
+    """
+    async def __aenter__(self) -> 'SourceProvider':
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        pass
+
+    @abstractmethod
+    async def load_index(self) -> str:
+        """Content of the module index CSV."""
+        pass
+
+    @abstractmethod
+    async def latest_releases(self, modules_info: dict[str, dict]) -> dict[str, dict]:
+        """Latest release of every module, each with at least a `tag_name`."""
+        pass
+
+    @abstractmethod
+    async def retrieve_module(self, module: dict, release: dict, extract_to: str) -> str:
+        """Write the parser inputs of `release` into `extract_to` and return the SHA-256 of the source archive."""
+        pass
+
+def _github_headers() -> dict:
+    token = os.getenv('GITHUB_TOKEN')
+    if not token:
+        raise_error("GITHUB_TOKEN environment variable is not set. Please set it to your GitHub token.")
+
+    return {
+        "Accept": "application/vnd.github.v3+json",
+        "X-GitHub-Api-Version": "2022-11-28",
+        "Authorization": f"Bearer {token}"
+    }
+
+def _api_url_from_repo_url(repo_url: str) -> str:
+    owner, repo = github_repository(repo_url)
+    return f"{GITHUB_API_URL}/repos/{owner}/{repo}"
+
+async def get_latest_release(github: GitHubClient, module: dict) -> dict:
+    api_url = _api_url_from_repo_url(module["git_hub_url"])
+    response = await github.get('/'.join([api_url, 'releases', 'latest']))
+    if response.status == 200:
+        release_info = response.json()
+        if 'tarball_url' in release_info:
+            return {'tag_name': release_info.get('tag_name'), 'tarball_url': release_info['tarball_url']}
+
+    release_info_list = await github.get_json('/'.join([api_url, 'releases']))
+    if len(release_info_list) > 0:
+        release_info = release_info_list[0]
+        if 'tarball_url' in release_info:
+            return {'tag_name': release_info.get('tag_name'), 'tarball_url': release_info['tarball_url']}
+
+    release_info_list = await github.get_json('/'.join([api_url, 'tags']))
+    if len(release_info_list) > 0:
+        release_info = release_info_list[0]
+        if 'tarball_url' in release_info:
+            return {'tag_name': release_info.get('name'), 'tarball_url': release_info['tarball_url']}
+
+    raise_error(f"Failed to get tarball URL for module {module['module_name']}. Please check the module's GitHub repository.")
+
+async def _latest_releases(module_names: list[str], tasks: list) -> dict[str, dict]:
+    """Run one release lookup per module; a module cannot be planned without its release, so any failure fails the run."""
+    outcomes = await TaskRunner(timeout=TASK_TIMEOUT).run(tasks)
+    errors = [f"{module_names[outcome.index]}: {outcome.error}" for outcome in outcomes if outcome.error is not None]
+    if errors:
+        raise_error("; ".join(errors))
+    return {module_names[outcome.index]: outcome.result for outcome in outcomes}
+
+def _tarball_cache_key(module: dict, release: dict) -> str:
+    owner, repo = github_repository(module['git_hub_url'])
+    return f"{owner}/{repo}@{release.get('commit_sha') or release['tag_name']}"
+
+class GitHubSource(SourceProvider):
+    """The AVM module index and the release tarballs of the module repositories on GitHub."""
+    def __init__(self, index_url: str = AVAILABLE_MODULES_URL):
+        self.index_url = index_url
+        self.client: HttpClient = None
+        self.github: GitHubClient = None
+        self.tarball_cache = FileCache(TARBALL_CACHE_PATH, TARBALL_CACHE_MAX_SIZE, suffix='.tar.gz')
+
+    async def __aenter__(self) -> 'GitHubSource':
+        self.client = await HttpClient().__aenter__()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        try:
+            if self.github is not None:
+                self.github.save()
+            self.tarball_cache.evict()
+        finally:
+            await self.client.__aexit__(exc_type, exc, tb)
+
+    def _github(self) -> GitHubClient:
+        if self.github is None:
+            self.github = GitHubClient(self.client, _github_headers())
+        return self.github
+
+    async def load_index(self) -> str:
+        logging.info("Loading modules info from AVM official website...")
+        return await self.client.get_text(self.index_url)
+
+    async def latest_releases(self, modules_info: dict[str, dict]) -> dict[str, dict]:
+        github = self._github()
+        releases = await ReleaseDiscovery(github).discover(modules_info)
+
+        # repositories GraphQL could not resolve fall back to the REST lookups
+        missing = [module for module in modules_info if module not in releases]
+        tasks = []
+        for module in missing:
+            tasks.append(get_latest_release(github, modules_info[module]))
+        releases.update(await _latest_releases(missing, tasks))
+        return {module: releases[module] for module in modules_info}
+
+    async def retrieve_module(self, module: dict, release: dict, extract_to: str) -> str:
+        cache_key = _tarball_cache_key(module, release)
+
+        # Download the package unless the same release is already cached
+        try:
+            tar_path = await asyncio.to_thread(self.tarball_cache.get, cache_key)
+            if tar_path is None:
+                logging.info("Downloading the latest version of module: %s", module['module_name'])
+                os.makedirs(DOWNLOADED_TAR_PATH, exist_ok=True)
+                dest_path = os.path.join(DOWNLOADED_TAR_PATH, f"{module['module_name']}.tar.gz")
+                tarball_sha256 = await self._github().download(release['tarball_url'], dest_path)
+                tar_path = self.tarball_cache.put_file(cache_key, dest_path, tarball_sha256)
+            else:
+                logging.info("Using the cached latest version of module: %s", module['module_name'])
+                tarball_sha256 = self.tarball_cache.checksum(cache_key)
+        except Exception as e:
+            raise_error(f"Failed to download module {module['module_name']}: {e}")
+
+        # Extract the downloaded file
+        await asyncio.to_thread(extract_module, tar_path, extract_to)
+        return tarball_sha256
+
+class LocalSource(SourceProvider):
+    """
+    An offline mirror: a module index CSV in the format of the AVM website and a directory holding, for every module,
+    a `<name>.tar.gz` GitHub tarball or a `<name>` checked-out repository, where `<name>` is the module name
+    or the repository name. The release tag of a local module is derived from the hash of its content.
+    """
+    def __init__(self, index_path: str, mirror_directory: str):
+        self.index_path = index_path
+        self.mirror_directory = mirror_directory
+
+    async def load_index(self) -> str:
+        logging.info(f"Loading modules info from {self.index_path}...")
+        with open(self.index_path, 'r', encoding='utf-8-sig') as f:
+            return f.read()
+
+    def _locate(self, module: dict) -> str:
+        _, repo_name = github_repository(module['git_hub_url'])
+        for name in (module['module_name'], repo_name):
+            for path in (os.path.join(self.mirror_directory, f"{name}.tar.gz"), os.path.join(self.mirror_directory, f"{name}.tgz")):
+                if os.path.isfile(path):
+                    return path
+            path = os.path.join(self.mirror_directory, name)
+            if os.path.isdir(path):
+                return path
+        raise_error(f"Module {module['module_name']} is not in the local mirror {self.mirror_directory}.")
+
+    def _release(self, module: dict) -> dict:
+        path = self._locate(module)
+        if os.path.isdir(path):
+            sha256 = hashlib.sha256(json.dumps(hash_module_inputs(path)).encode('utf-8')).hexdigest()
+        else:
+            sha256 = sha256_file(path)
+        return {'tag_name': f"local-{sha256[:12]}", 'path': path, 'sha256': sha256}
+
+    async def latest_releases(self, modules_info: dict[str, dict]) -> dict[str, dict]:
+        tasks = []
+        for module in modules_info.values():
+            tasks.append(lambda module=module: self._release(module))
+        return await _latest_releases(list(modules_info.keys()), tasks)
+
+    async def retrieve_module(self, module: dict, release: dict, extract_to: str) -> str:
+        logging.info("Copying module %s from %s", module['module_name'], release['path'])
+        if os.path.isdir(release['path']):
+            await asyncio.to_thread(copy_module, release['path'], extract_to)
+        else:
+            await asyncio.to_thread(extract_module, release['path'], extract_to)
+        return release['sha256']
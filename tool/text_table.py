@@ -0,0 +1,44 @@
+import hashlib
+import json
+import os
+
+# variable fields moved to the text table by `share_texts`
+SHARED_TEXT_FIELDS = ('schema', 'description')
+
+def _text_key(text: str) -> str:
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()[:16]
+
+def share_texts(data: dict[str, dict]) -> dict[str, str]:
+    """
+    Replace the `schema` and `description` of every variable with `{"$ref": key}` and return the table of texts.
+    Keys are content hashes, so a text repeated across variables and modules is stored once.
+    """
+    table = {}
+    for module in data.values():
+        for variable in module.get('variables', {}).values():
+            for field in SHARED_TEXT_FIELDS:
+                text = variable.get(field)
+                if isinstance(text, str):
+                    key = _text_key(text)
+                    table[key] = text
+                    variable[field] = {'$ref': key}
+    return dict(sorted(table.items()))
+
+def resolve_text(value, table: dict[str, str]):
+    if isinstance(value, dict) and '$ref' in value:
+        return table[value['$ref']]
+    return value
+
+def resolve_texts(data: dict[str, dict], table: dict[str, str]):
+    """Inverse of `share_texts`: put every referenced text back into its variable."""
+    for module in data.values():
+        for variable in module.get('variables', {}).values():
+            for field in SHARED_TEXT_FIELDS:
+                if field in variable:
+                    variable[field] = resolve_text(variable[field], table)
+
+def load_text_table(file_path: str) -> dict[str, str]:
+    if not os.path.exists(file_path):
+        return {}
+    with open(file_path, 'r', encoding='utf-8') as f:
+        return json.load(f)
@@ -0,0 +1,54 @@
+import hashlib
+import json
+import os
+
+def _subtree_key(subtree) -> str:
+    return hashlib.sha256(json.dumps(subtree, separators=(',', ':'), sort_keys=True).encode('utf-8')).hexdigest()[:16]
+
+def _share(type_tree, table: dict[str, dict]):
+    if isinstance(type_tree, str):
+        return type_tree
+
+    if 'object' in type_tree:
+        subtree = {'object': {name: {**attribute, 'type': _share(attribute['type'], table)} for name, attribute in type_tree['object'].items()}}
+    else:
+        subtree = {kind: _share(element, table) for kind, element in type_tree.items()}
+
+    key = _subtree_key(subtree)
+    table[key] = subtree
+    return {'$ref': key}
+
+def share_type_subtrees(data: dict[str, dict]) -> dict[str, dict]:
+    """
+    Replace the `type` tree of every variable with `{"$ref": key}` and return the table of shared subtrees.
+    Keys are content hashes, so a shape repeated across variables and modules is stored once,
+    and table entries refer to their own object and collection members the same way.
+    """
+    table = {}
+    for module in data.values():
+        for variable in module.get('variables', {}).values():
+            if 'type' in variable:
+                variable['type'] = _share(variable['type'], table)
+    return dict(sorted(table.items()))
+
+def resolve_type(type_tree, table: dict[str, dict]):
+    if isinstance(type_tree, str):
+        return type_tree
+    if '$ref' in type_tree:
+        return resolve_type(table[type_tree['$ref']], table)
+    if 'object' in type_tree:
+        return {'object': {name: {**attribute, 'type': resolve_type(attribute['type'], table)} for name, attribute in type_tree['object'].items()}}
+    return {kind: resolve_type(element, table) for kind, element in type_tree.items()}
+
+def resolve_type_subtrees(data: dict[str, dict], table: dict[str, dict]):
+    """Inverse of `share_type_subtrees`: expand every `$ref` back into an inline type tree."""
+    for module in data.values():
+        for variable in module.get('variables', {}).values():
+            if 'type' in variable:
+                variable['type'] = resolve_type(variable['type'], table)
+
+def load_type_table(file_path: str) -> dict[str, dict]:
+    if not os.path.exists(file_path):
+        return {}
+    with open(file_path, 'r', encoding='utf-8') as f:
+        return json.load(f)
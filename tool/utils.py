@@ -1,77 +1,283 @@
-import asyncio
-import os
-from typing import List, Callable, Awaitable, Union, TypeVar
-
-TOOL_DIRECTORY_PATH = os.path.dirname(os.path.abspath(__file__))
-AZURERM_TO_AVM_FILE_PATH = os.path.join(TOOL_DIRECTORY_PATH, 'azurerm_to_avm.json')
-DATA_DIRECTORY_PATH = os.path.join(TOOL_DIRECTORY_PATH, 'e9666d6d-96ee-4eb0-94e4-92c5f9bfca1d')
-DOWNLOADED_TAR_PATH = os.path.join(DATA_DIRECTORY_PATH, 'downloaded')
-DATA_FILE_NAME = 'avm_data.json'
-ORIGIN_DATA_FILE_PATH = os.path.join(os.path.dirname(TOOL_DIRECTORY_PATH), 'data', 'avm_data.json')
-DEBUG_DATA_FILE_PATH = os.path.join(DATA_DIRECTORY_PATH, DATA_FILE_NAME)
-RULES_FILE_PATH = os.path.join(TOOL_DIRECTORY_PATH, 'rules.json')
-
-AVAILABLE_MODULES_URL = "https://raw.githubusercontent.com/Azure/Azure-Verified-Modules/main/docs/static/module-indexes/TerraformResourceModules.csv"
-
-def raise_error(message: str):
-    raise Exception(message)
-
-T = TypeVar('T')
-
-async def run_tasks(
-    tasks: List[Union[Callable[[], T], Callable[[], Awaitable[T]], Awaitable[T]]],
-    max_concurrency: int = None
-) -> List[T]:
-    """
-    Run multiple tasks concurrently using asyncio.
-    
-    Args:
-        tasks: A list of tasks to run. Can be:
-            - Synchronous functions (will be wrapped in asyncio.to_thread)
-            - Async functions (will be called)
-            - Awaitable objects (like coroutines, will be awaited directly)
-        max_concurrency: Maximum number of tasks to run concurrently.
-                         If None, all tasks will run concurrently.
-    
-    Returns:
-        A list of results from each task in the same order as input tasks.
-    """
-    async def _wrap_sync_function(func):
-        """Wrap a synchronous function in asyncio.to_thread."""
-        if asyncio.iscoroutinefunction(func):
-            return await func()
-        elif asyncio.iscoroutine(func):
-            return await func
-        else:
-            # Assume it's a regular synchronous function
-            return await asyncio.to_thread(func)
-    
-    # Prepare all tasks
-    async_tasks = []
-    for task in tasks:
-        if asyncio.iscoroutine(task):
-            # It's already a coroutine
-            async_tasks.append(task)
-        elif asyncio.iscoroutinefunction(task):
-            # It's an async function, call it
-            async_tasks.append(task())
-        else:
-            # It's a sync function, wrap it
-            async_tasks.append(_wrap_sync_function(task))
-    
-    # If max_concurrency is set, use a semaphore to limit concurrency
-    if max_concurrency:
-        sem = asyncio.Semaphore(max_concurrency)
-        
-        async def _limited_task(task):
-            async with sem:
-                return await task
-        
-        # Wrap all tasks with the semaphore
-        limited_tasks = [_limited_task(task) for task in async_tasks]
-        
-        # Gather all tasks
-        return await asyncio.gather(*limited_tasks)
-    else:
-        # Run all tasks concurrently without limits
-        return await asyncio.gather(*async_tasks)
\ No newline at end of file
+import asyncio
+import contextlib
+import contextvars
+import logging
+import os
+import time
+from typing import List, Callable, Awaitable, Union, TypeVar, Iterable, AsyncIterator, NamedTuple
+
+TOOL_DIRECTORY_PATH = os.path.dirname(os.path.abspath(__file__))
+AZURERM_TO_AVM_FILE_PATH = os.path.join(TOOL_DIRECTORY_PATH, 'azurerm_to_avm.json')
+DATA_DIRECTORY_PATH = os.path.join(TOOL_DIRECTORY_PATH, 'e9666d6d-96ee-4eb0-94e4-92c5f9bfca1d')
+DOWNLOADED_TAR_PATH = os.path.join(DATA_DIRECTORY_PATH, 'downloaded')
+DATA_FILE_NAME = 'avm_data.json'
+ORIGIN_DATA_FILE_PATH = os.path.join(os.path.dirname(TOOL_DIRECTORY_PATH), 'data', 'avm_data.json')
+DEBUG_DATA_FILE_PATH = os.path.join(DATA_DIRECTORY_PATH, DATA_FILE_NAME)
+MANIFEST_FILE_PATH = os.path.join(os.path.dirname(TOOL_DIRECTORY_PATH), 'data', 'avm_manifest.json')
+TYPE_TABLE_FILE_PATH = os.path.join(os.path.dirname(TOOL_DIRECTORY_PATH), 'data', 'avm_types.json')
+TEXT_TABLE_FILE_PATH = os.path.join(os.path.dirname(TOOL_DIRECTORY_PATH), 'data', 'avm_texts.json')
+MODULES_FILE_PATH = os.path.join(os.path.dirname(TOOL_DIRECTORY_PATH), 'data', 'avm_modules.jsonl')
+MODULE_INDEX_FILE_PATH = os.path.join(os.path.dirname(TOOL_DIRECTORY_PATH), 'data', 'avm_modules_index.json')
+RULES_FILE_PATH = os.path.join(TOOL_DIRECTORY_PATH, 'rules.json')
+
+AVAILABLE_MODULES_URL = "https://raw.githubusercontent.com/Azure/Azure-Verified-Modules/main/docs/static/module-indexes/TerraformResourceModules.csv"
+
+GITHUB_API_URL = os.getenv('GITHUB_API_URL', 'https://api.github.com').rstrip('/')
+GITHUB_GRAPHQL_URL = os.getenv('GITHUB_GRAPHQL_URL', f'{GITHUB_API_URL}/graphql')
+GITHUB_MAX_RETRIES = int(os.getenv('AVM_GITHUB_MAX_RETRIES', '5'))
+
+# persistent caches survive between runs, unlike DATA_DIRECTORY_PATH
+CACHE_DIRECTORY_PATH = os.getenv('AVM_CACHE_DIRECTORY', os.path.join(os.path.expanduser('~'), '.cache', 'terraform-avm-rag-data'))
+GITHUB_ETAG_CACHE_FILE_PATH = os.path.join(CACHE_DIRECTORY_PATH, 'github_etags.json')
+RELEASE_CACHE_FILE_PATH = os.path.join(CACHE_DIRECTORY_PATH, 'releases.json')
+RELEASE_CACHE_TTL = int(os.getenv('AVM_RELEASE_CACHE_TTL', '1800'))
+TARBALL_CACHE_PATH = os.path.join(CACHE_DIRECTORY_PATH, 'tarballs')
+TARBALL_CACHE_MAX_SIZE = int(os.getenv('AVM_TARBALL_CACHE_MAX_SIZE', str(1024 * 1024 * 1024)))
+PARSE_CACHE_PATH = os.path.join(CACHE_DIRECTORY_PATH, 'parsed')
+PARSE_CACHE_MAX_SIZE = int(os.getenv('AVM_PARSE_CACHE_MAX_SIZE', str(256 * 1024 * 1024)))
+
+# maximum number of concurrent HTTP requests against the same host
+HTTP_PER_HOST_CONCURRENCY = int(os.getenv('AVM_HTTP_CONCURRENCY', '10'))
+
+# number of worker processes parsing HCL, 0 parses in a thread of the main process
+HCL_PARSER_WORKERS = int(os.getenv('AVM_HCL_PARSER_WORKERS', str(os.cpu_count() or 1)))
+
+# modules each stage of the module pipeline may hold before the stage in front of it waits
+PIPELINE_QUEUE_SIZE = int(os.getenv('AVM_PIPELINE_QUEUE_SIZE', '16'))
+
+# seconds a task run by TaskRunner may take, not counting rate limit waits, 0 disables the timeout
+TASK_TIMEOUT = float(os.getenv('AVM_TASK_TIMEOUT', '600'))
+
+# bumped whenever the generated module data or the manifest changes shape, an incremental run then rebuilds every module.
+# Manifests written before the version was recorded have none and are never reused.
+#   2: variables carry their `type` tree
+#   3: dependency lists are sorted, modules carry their `layer` and dependency `closure`
+#   4: the manifest records the modules the examples of every module refer to
+DATA_FORMAT_VERSION = 4
+
+# keys generated by the parse and dependency stages, reused from the previous data for unchanged modules
+REUSED_MODULE_KEYS = ['outputs', 'variables', 'denpends_on']
+
+def raise_error(message: str):
+    raise Exception(message)
+
+def github_repository(repo_url: str) -> tuple[str, str]:
+    """The owner and the name of the repository at a GitHub URL such as https://github.com/Azure/terraform-azurerm-avm-res-keyvault-vault."""
+    _, owner, name = repo_url.rstrip('/').rsplit('/', 2)
+    return owner, name
+
+T = TypeVar('T')
+
+Task = Union[Callable[[], T], Callable[[], Awaitable[T]], Awaitable[T]]
+
+class TaskOutcome(NamedTuple):
+    index: int  # position of the task in the input
+    result: object
+    error: BaseException  # None when the task succeeded
+    attempts: int
+    elapsed: float
+
+class _AttemptTimeout(TimeoutError):
+    pass
+
+class _AttemptDeadline:
+    """The timeout of the TaskRunner attempt running in the current task, see `paused_timeout`."""
+    def __init__(self, timeout: asyncio.Timeout):
+        self.timeout = timeout
+        self.active = True
+        self.paused = 0
+        self.remaining = 0.0
+
+_attempt_deadline: contextvars.ContextVar[_AttemptDeadline] = contextvars.ContextVar('_attempt_deadline', default=None)
+
+@contextlib.asynccontextmanager
+async def paused_timeout():
+    """Time spent in the block, e.g. waiting for a rate limit to reset, does not count against the TaskRunner timeout."""
+    deadline = _attempt_deadline.get()
+    if deadline is None or not deadline.active:
+        yield
+        return
+
+    loop = asyncio.get_running_loop()
+    if deadline.paused == 0:
+        deadline.remaining = deadline.timeout.when() - loop.time()
+        deadline.timeout.reschedule(None)
+    deadline.paused += 1
+    try:
+        yield
+    finally:
+        deadline.paused -= 1
+        if deadline.paused == 0 and deadline.active:
+            deadline.timeout.reschedule(loop.time() + deadline.remaining)
+
+class AdaptiveLimit:
+    """
+    Concurrency limit adjusted after every task, additive increase and multiplicative decrease: it grows by one while
+    the average latency stays within twice the best average seen and the process has CPU to spare, and halves when
+    the latency climbs above that or the event loop thread keeps the CPU busy.
+    """
+    def __init__(self, initial: int, maximum: int, minimum: int = 1):
+        self.limit = initial
+        self.minimum = minimum
+        self.maximum = maximum
+        self._latency: float = None
+        self._best_latency: float = None
+        self._cpu_mark = (time.process_time(), time.monotonic())
+        self._cpu_busy = False
+
+    def _update_cpu(self):
+        cpu, wall = time.process_time(), time.monotonic()
+        if wall - self._cpu_mark[1] >= 0.5:
+            self._cpu_busy = cpu - self._cpu_mark[0] >= 0.9 * (wall - self._cpu_mark[1])
+            self._cpu_mark = (cpu, wall)
+
+    def record(self, latency: float):
+        self._latency = latency if self._latency is None else 0.8 * self._latency + 0.2 * latency
+        self._best_latency = self._latency if self._best_latency is None else min(self._best_latency, self._latency)
+        self._update_cpu()
+
+        if self._cpu_busy or self._latency > 2 * self._best_latency:
+            limit = max(self.minimum, self.limit // 2)
+        else:
+            limit = min(self.maximum, self.limit + 1)
+        if limit != self.limit:
+            logging.debug(f"Concurrency limit {self.limit} -> {limit}, average latency {self._latency:.3f}s, CPU busy: {self._cpu_busy}")
+            self.limit = limit
+
+class TaskRunner:
+    """
+    Runs tasks with a concurrency limit, a timeout and retries per task, and reports every task as a `TaskOutcome`
+    instead of failing on the first error; the failed ones are also collected in `errors`.
+
+    Args:
+        max_concurrency: Maximum number of tasks to run at once, the initial limit when `adaptive`.
+                         If None, every task may run at once.
+        timeout: Seconds each attempt may take, None or 0 for no limit. Time spent in `paused_timeout` blocks is not counted.
+        retries: How many times a failed task is attempted again, with a delay doubling from `retry_delay`.
+                 Only callables can be retried, an awaitable can be awaited once. A timed out attempt of a synchronous
+                 callable is not retried either, its thread cannot be stopped and would run next to the retry.
+        adaptive: Adjust the limit from the observed latency and CPU use, between 1 and 4 * `max_concurrency`.
+        in_thread: Run synchronous callables with asyncio.to_thread, or in the event loop for trivial work.
+    """
+    def __init__(self, max_concurrency: int = None, timeout: float = None, retries: int = 0, retry_delay: float = 1.0,
+                 adaptive: bool = False, in_thread: bool = True):
+        self.timeout = timeout or None
+        self.retries = retries
+        self.retry_delay = retry_delay
+        self.in_thread = in_thread
+        self.adaptive_limit = AdaptiveLimit(max_concurrency, max_concurrency * 4) if adaptive and max_concurrency else None
+        self.max_concurrency = max_concurrency
+        self.errors: list[TaskOutcome] = []
+        self._active = 0
+        self._condition: asyncio.Condition = None
+
+    @property
+    def limit(self) -> float:
+        if self.adaptive_limit is not None:
+            return self.adaptive_limit.limit
+        return self.max_concurrency or float('inf')
+
+    def _in_thread(self, task: Task) -> bool:
+        return self.in_thread and callable(task) and not asyncio.iscoroutinefunction(task)
+
+    async def _call(self, task: Task):
+        if asyncio.iscoroutine(task) or asyncio.isfuture(task):
+            awaitable = task
+        elif asyncio.iscoroutinefunction(task):
+            awaitable = task()
+        elif self._in_thread(task):
+            awaitable = asyncio.to_thread(task)
+        else:
+            return task()
+        if self.timeout is None:
+            return await awaitable
+
+        try:
+            async with asyncio.timeout(self.timeout) as timeout:
+                deadline = _AttemptDeadline(timeout)
+                token = _attempt_deadline.set(deadline)
+                try:
+                    return await awaitable
+                finally:
+                    deadline.active = False
+                    _attempt_deadline.reset(token)
+        except TimeoutError:
+            if timeout.expired():
+                raise _AttemptTimeout(f"Timed out after {self.timeout}s")
+            raise
+
+    async def _attempt(self, index: int, task: Task) -> TaskOutcome:
+        attempts = 0
+        start = time.monotonic()
+        while True:
+            attempts += 1
+            attempt_start = time.monotonic()
+            timed_out = False
+            try:
+                result = await self._call(task)
+                error = None
+            except Exception as e:
+                result = None
+                error = e
+                timed_out = isinstance(e, _AttemptTimeout)
+            if self.adaptive_limit is not None:
+                self.adaptive_limit.record(time.monotonic() - attempt_start)
+            if error is None or attempts > self.retries or not callable(task) or (timed_out and self._in_thread(task)):
+                break
+            logging.warning(f"Task {index} failed on attempt {attempts}, retrying: {error}")
+            await asyncio.sleep(self.retry_delay * 2 ** (attempts - 1))
+
+        outcome = TaskOutcome(index, result, error, attempts, time.monotonic() - start)
+        if error is not None:
+            self.errors.append(outcome)
+        return outcome
+
+    async def call(self, task: Task, index: int = 0) -> TaskOutcome:
+        """Run one task once a slot of the limit is free, the runner can be shared by several consumers."""
+        if self._condition is None:
+            self._condition = asyncio.Condition()
+        async with self._condition:
+            await self._condition.wait_for(lambda: self._active < self.limit)
+            self._active += 1
+        try:
+            return await self._attempt(index, task)
+        finally:
+            async with self._condition:
+                self._active -= 1
+                self._condition.notify_all()
+
+    async def as_completed(self, tasks: Iterable[Task]) -> AsyncIterator[TaskOutcome]:
+        """
+        Yield the outcome of every task as soon as it finishes. Tasks are only started while the limit allows,
+        so a consumer that stops iterating also stops new tasks from starting; leaving the loop cancels the running ones.
+        """
+        iterator = enumerate(tasks)
+        pending = set()
+        exhausted = False
+        try:
+            while True:
+                while not exhausted and len(pending) < self.limit:
+                    item = next(iterator, None)
+                    if item is None:
+                        exhausted = True
+                        break
+                    pending.add(asyncio.ensure_future(self.call(item[1], item[0])))
+                if not pending:
+                    return
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for future in done:
+                    yield future.result()
+        finally:
+            for future in pending:
+                future.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+            # awaitables created by the caller but never started
+            for _, task in iterator:
+                if asyncio.iscoroutine(task):
+                    task.close()
+
+    async def run(self, tasks: Iterable[Task]) -> List[TaskOutcome]:
+        """The outcomes of all tasks, in the order of the input."""
+        async with contextlib.aclosing(self.as_completed(tasks)) as iterator:
+            outcomes = [outcome async for outcome in iterator]
+        return sorted(outcomes, key=lambda outcome: outcome.index)